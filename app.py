@@ -2,20 +2,29 @@
 EFI IT Issue Tracker Flask Application
 A secure web application for managing IT issues with role-based access control
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file
+from flask import Flask, Response, g, render_template, request, redirect, url_for, flash, session, jsonify, send_file
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from functools import wraps
 import csv
 from io import StringIO
+from urllib.parse import quote
 import os
+from markupsafe import Markup, escape
 from werkzeug.utils import secure_filename
-import uuid
-from datetime import datetime
-from models import Database, User, Issue, AuditLog, Document, Company, Department, Application
+from datetime import datetime, timedelta
+from models import (Database, User, Issue, IssueCounters, AuditLog, Document, Company, Department, Application,
+                    DataGeneration, get_db, close_db)
+from backup import Backup
+from dashboard_stats import DashboardStats
+from issue_import import IssueImport
+from jobs import JobQueue
+from uploads import UploadRequest
+from cache import ResultCache, result_cache, user_cache
 from config import config
 
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 # Load configuration based on environment
 env = os.environ.get('FLASK_ENV', 'development')
@@ -28,6 +37,13 @@ if env == 'production':
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Document uploads are streamed to disk and checked while the request is parsed
+UploadRequest.STREAMED_ENDPOINTS['upload_document'] = ('UPLOAD_FOLDER', 'MAX_CONTENT_LENGTH', b'%PDF-')
+
+# Import files are streamed into the job folder and may be larger than other uploads
+UploadRequest.STREAMED_ENDPOINTS['import_issues'] = ('JOB_FOLDER', 'IMPORT_MAX_SIZE', None)
+UploadRequest.SIZE_LIMITS['import_issues'] = 'IMPORT_MAX_SIZE'
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -36,9 +52,31 @@ login_manager.login_view = 'login'
 # Initialize database with configured path
 db = Database(app.config['DATABASE_PATH'])
 
-# Ensure database is initialized (with auto-migration) when app starts
-# This runs both in development (python app.py) and production (gunicorn)
-db.init_db()
+# Ensure database is initialized (with auto-migration) when app starts.
+# This runs both in development (python app.py) and production (gunicorn);
+# it only reads the schema version unless a migration is pending. Start
+# gunicorn with --preload to run it once in the master instead of per worker.
+db.ensure_schema()
+
+# Close the request-scoped database connection when the app context ends
+app.teardown_appcontext(close_db)
+
+
+@app.before_request
+def start_job_workers():
+    """Start this worker process's background job threads on its first request"""
+    JobQueue.start_workers(app.config['JOB_WORKER_THREADS'])
+
+
+@app.before_request
+def check_data_generation():
+    """
+    Notice a restore or reset made by any process: this worker's cached
+    results, users and reference data are dropped, and sessions issued
+    before it stop loading (see FlaskUser.get_id)
+    """
+    if request.endpoint != 'static':
+        g.data_generation = DataGeneration.check()
 
 
 class FlaskUser(UserMixin):
@@ -51,6 +89,10 @@ class FlaskUser(UserMixin):
         self.company = user_data.get('company')
         self.department = user_data.get('department')
 
+    def get_id(self):
+        """Session id: the user id and the database generation it was issued in"""
+        return f"{self.id}:{g.get('data_generation')}"
+
     def is_admin(self):
         return self.role == 'admin'
 
@@ -81,7 +123,11 @@ class FlaskUser(UserMixin):
 @login_manager.user_loader
 def load_user(user_id):
     """Load user for Flask-Login"""
-    user_data = User.get_by_id(int(user_id))
+    # After a restore or reset the same id may be a different account
+    user_id, _, generation = user_id.partition(':')
+    if generation != str(g.get('data_generation')):
+        return None
+    user_data = User.get_session_user(int(user_id))
     if user_data:
         return FlaskUser(user_data)
     return None
@@ -114,6 +160,90 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+def issue_scope():
+    """Company/department restriction for the current user (empty for admins)"""
+    if current_user.is_admin():
+        return {}
+    # HOD and Viewer only see issues from their company/department
+    return {'company': current_user.company, 'department': current_user.department}
+
+
+def get_issue_filters(default_status=''):
+    """
+    Read the tracker filter, search and sort parameters from the query string.
+    Returns (filters, search_query, sort_keys); shared by the tracker and the
+    CSV export so both select exactly the same issues.
+    """
+    filters = {
+        'status': request.args.get('status', default_status),
+        'priority': request.args.get('priority', ''),
+        'category': request.args.get('category', ''),
+        'company': request.args.get('company', ''),
+        'department': request.args.get('department', ''),
+        'application': request.args.get('application', '')
+    }
+    search_query = request.args.get('search', '')
+
+    # Server-side sort: comma separated column names, '-' prefix for descending.
+    # Searches are ordered by relevance unless a column sort was chosen; the
+    # filter form re-submits the default sort, so that counts as none chosen.
+    sort_keys = [key for key in request.args.get('sort', '').split(',')
+                 if key.lstrip('-') in Issue.SORT_KEYS or key == Issue.RELEVANCE][:3]
+    if not sort_keys or (search_query and sort_keys == list(Issue.DEFAULT_SORT)):
+        sort_keys = [Issue.RELEVANCE] if search_query else list(Issue.DEFAULT_SORT)
+
+    return filters, search_query, sort_keys
+
+
+def cache_scope():
+    """(company, department) key for the current user's cached results"""
+    scope = issue_scope()
+    return scope.get('company'), scope.get('department')
+
+
+def iter_csv(batches):
+    """
+    Generate the issue export CSV from batches of issues (Issue.iter_query),
+    one chunk of text per batch. Closes the batches when done.
+    """
+    si = StringIO()
+    writer = csv.writer(si)
+
+    # Write header
+    writer.writerow(['ID', 'Title', 'Description', 'Company', 'Department', 'Application',
+                     'Category', 'Priority', 'Status', 'Created By',
+                     'Created At', 'Updated At'])
+
+    # Write data one batch at a time
+    try:
+        for issues in batches:
+            for issue in issues:
+                writer.writerow([
+                    issue['id'],
+                    issue['title'],
+                    issue['description'],
+                    issue['company'] or '',
+                    issue['department'] or '',
+                    issue['application'] or '',
+                    issue['category'],
+                    issue['priority'],
+                    issue['status'],
+                    issue['created_by'],
+                    issue['created_at'],
+                    issue['updated_at']
+                ])
+            yield si.getvalue()
+            si.seek(0)
+            si.truncate(0)
+    finally:
+        # Release the export's database connection even if the client disconnects
+        batches.close()
+
+    # Header only when there are no matching issues
+    if si.tell():
+        yield si.getvalue()
+
+
 def format_file_size(size_bytes):
     """Format file size in human readable format"""
     for unit in ['B', 'KB', 'MB', 'GB']:
@@ -167,75 +297,12 @@ def logout():
 @login_required
 def dashboard():
     """Dashboard with KPIs and charts"""
-    from collections import Counter
-
-    # Get issues based on user role
-    if current_user.is_admin():
-        issues = Issue.get_all()
-    else:
-        issues = Issue.get_all(
-            company=current_user.company,
-            department=current_user.department
-        )
-
-    # Filter out closed issues from charts
-    active_issues = [i for i in issues if i['status'] != 'Closed']
-
-    # Calculate KPIs
-    kpi = {
-        'total_issues': len(active_issues),
-        'open_issues': len([i for i in active_issues if i['status'] == 'Not Started']),
-        'in_progress_issues': len([i for i in active_issues if i['status'] == 'In Progress']),
-        'resolved_issues': len([i for i in active_issues if i['status'] == 'Resolved'])
-    }
-
-    # Prepare chart data (excluding closed issues)
-    # Status distribution
-    status_counter = Counter(i['status'] for i in active_issues)
-    status_labels = ['Not Started', 'In Progress', 'Resolved']
-    status_values = [status_counter.get(s, 0) for s in status_labels]
-
-    # Priority distribution
-    priority_counter = Counter(i['priority'] for i in active_issues)
-    priority_labels = ['Low', 'Medium', 'High', 'Critical']
-    priority_values = [priority_counter.get(p, 0) for p in priority_labels]
-
-    # Category distribution
-    category_counter = Counter(i['category'] for i in active_issues)
-    category_labels = list(category_counter.keys())
-    category_values = list(category_counter.values())
-
-    # Company distribution by status (stacked, excluding closed)
-    company_status_data = {}
-    valid_statuses = ['Not Started', 'In Progress', 'Resolved']
-    for issue in active_issues:
-        company = issue['company'] or 'Unassigned'
-        status = issue['status']
-        if company not in company_status_data:
-            company_status_data[company] = {'Not Started': 0, 'In Progress': 0, 'Resolved': 0}
-        # Only count valid statuses (handle legacy data)
-        if status in valid_statuses:
-            company_status_data[company][status] += 1
-
-    # Get top 10 companies by total issues
-    sorted_companies = sorted(company_status_data.items(), key=lambda x: sum(x[1].values()), reverse=True)[:10]
-    company_labels = [c[0] for c in sorted_companies]
-    company_not_started = [company_status_data[c]['Not Started'] for c in company_labels]
-    company_in_progress = [company_status_data[c]['In Progress'] for c in company_labels]
-    company_resolved = [company_status_data[c]['Resolved'] for c in company_labels]
-
-    chart_data = {
-        'status_labels': status_labels,
-        'status_values': status_values,
-        'priority_labels': priority_labels,
-        'priority_values': priority_values,
-        'category_labels': category_labels,
-        'category_values': category_values,
-        'company_labels': company_labels,
-        'company_not_started': company_not_started,
-        'company_in_progress': company_in_progress,
-        'company_resolved': company_resolved
-    }
+    # Aggregate issues (excluding closed) in SQL, scoped by user role
+    scope = issue_scope()
+    kpi, chart_data = result_cache.get_or_set(
+        ResultCache.make_key(cache_scope(), 'dashboard', {}),
+        lambda: DashboardStats.get(**scope)
+    )
 
     return render_template('dashboard.html', kpi=kpi, chart_data=chart_data)
 
@@ -245,46 +312,67 @@ def dashboard():
 def tracker():
     """Issue tracker showing list of issues (defaults to Open issues)"""
     # Get filter parameters - default to 'Not Started' status if no parameters provided
-    status_filter = request.args.get('status', 'Not Started' if not request.args else '')
-    priority_filter = request.args.get('priority', '')
-    category_filter = request.args.get('category', '')
-    company_filter = request.args.get('company', '')
-    department_filter = request.args.get('department', '')
-    application_filter = request.args.get('application', '')
-    search_query = request.args.get('search', '')
+    filters, search_query, sort_keys = get_issue_filters('Not Started' if not request.args else '')
+    status_filter = filters['status']
+
+    page_size = request.args.get('page_size', app.config['TRACKER_PAGE_SIZE'], type=int)
+    if page_size not in app.config['TRACKER_PAGE_SIZES']:
+        page_size = app.config['TRACKER_PAGE_SIZE']
+
+    # Get one page of issues based on user role with all filters applied in SQL
+    after = request.args.get('after')
+    before = request.args.get('before')
+    scope = issue_scope()
+
+    cache_args = dict(filters, search=search_query, sort=sort_keys, page_size=page_size, after=after, before=before)
+    page = result_cache.get_or_set(
+        ResultCache.make_key(cache_scope(), 'tracker', cache_args),
+        lambda: Issue.paginate(filters=filters, search=search_query, sort=sort_keys, page_size=page_size,
+                               after=after, before=before, **scope)
+    )
 
-    # Get issues based on user role
-    if current_user.is_admin():
-        # Admin sees all issues
-        issues = Issue.get_all()
-    else:
-        # HOD and Viewer only see issues from their company/department
-        issues = Issue.get_all(
-            company=current_user.company,
-            department=current_user.department
-        )
+    # The total doesn't depend on the page or sort order, so paging through
+    # a search reuses one count instead of recounting for every page
+    total_issues = result_cache.get_or_set(
+        ResultCache.make_key(cache_scope(), 'tracker_count', dict(filters, search=search_query)),
+        lambda: Issue.count(filters=filters, search=search_query, **scope)
+    )
 
-    # Apply filters
-    if status_filter:
-        issues = [i for i in issues if i['status'] == status_filter]
-    if priority_filter:
-        issues = [i for i in issues if i['priority'] == priority_filter]
-    if category_filter:
-        issues = [i for i in issues if i['category'] == category_filter]
-    if company_filter:
-        issues = [i for i in issues if (i['company'] or '').lower() == company_filter.lower()]
-    if department_filter:
-        issues = [i for i in issues if (i['department'] or '').lower() == department_filter.lower()]
-    if application_filter:
-        issues = [i for i in issues if (i['application'] or '').lower() == application_filter.lower()]
+    # Query arguments that every pagination/sort link must carry over
+    query_args = {key: value for key, value in filters.items() if value}
+    query_args.update({
+        'status': status_filter,
+        'search': search_query or None,
+        'sort': ','.join(sort_keys),
+        'page_size': page_size
+    })
+
+    # Clicking a column header makes it the primary sort (toggling direction
+    # if it already is) and keeps the previous primary column as secondary
+    sort_links = {}
+    primary = sort_keys[0].lstrip('-')
+    for column in Issue.SORT_KEYS:
+        if column == primary:
+            new_keys = [sort_keys[0][1:] if sort_keys[0].startswith('-') else '-' + column]
+        else:
+            new_keys = ['-' + column if column in ('created_at', 'updated_at') else column]
+            new_keys.append(sort_keys[0])
+        if search_query and new_keys == list(Issue.DEFAULT_SORT):
+            # Keep an explicit newest-first sort from being read as the search default
+            new_keys.append(Issue.RELEVANCE)
+        sort_links[column] = url_for('tracker', **dict(query_args, sort=','.join(new_keys)))
     if search_query:
-        search_lower = search_query.lower()
-        issues = [i for i in issues if
-                  search_lower in i['title'].lower() or
-                  search_lower in i['description'].lower() or
-                  search_lower in (i['company'] or '').lower() or
-                  search_lower in (i['department'] or '').lower() or
-                  search_lower in (i['application'] or '').lower()]
+        sort_links[Issue.RELEVANCE] = url_for('tracker', **dict(query_args, sort=Issue.RELEVANCE))
+
+    pagination = {
+        'page_size': page_size,
+        'page_sizes': app.config['TRACKER_PAGE_SIZES'],
+        'total': total_issues,
+        'query_args': query_args,
+        'first_url': url_for('tracker', **query_args) if page['prev_cursor'] else None,
+        'prev_url': url_for('tracker', before=page['prev_cursor'], **query_args) if page['prev_cursor'] else None,
+        'next_url': url_for('tracker', after=page['next_cursor'], **query_args) if page['next_cursor'] else None,
+    }
 
     # Get available options for dropdowns
     companies = Company.get_all()
@@ -292,13 +380,16 @@ def tracker():
     applications = Application.get_all()
 
     return render_template('tracker.html',
-                           issues=issues,
+                           issues=page['issues'],
+                           pagination=pagination,
+                           sort_keys=sort_keys,
+                           sort_links=sort_links,
                            status_filter=status_filter,
-                           priority_filter=priority_filter,
-                           category_filter=category_filter,
-                           company_filter=company_filter,
-                           department_filter=department_filter,
-                           application_filter=application_filter,
+                           priority_filter=filters['priority'],
+                           category_filter=filters['category'],
+                           company_filter=filters['company'],
+                           department_filter=filters['department'],
+                           application_filter=filters['application'],
                            search_query=search_query,
                            companies=companies,
                            departments=departments,
@@ -458,6 +549,47 @@ def edit_issue(issue_id):
     return render_template('edit_issue.html', issue=issue, companies=companies, departments=departments, applications=applications)
 
 
+@app.route('/issues/bulk-update', methods=['POST'])
+@login_required
+@hod_or_admin_required
+def bulk_update_issues():
+    """Apply one status/priority/category/assignee change to the selected issues (HOD or admin)"""
+    # The form posts to the tracker's query string, so go back to the same page
+    back = url_for('tracker', **request.args.to_dict())
+    issue_ids = request.form.getlist('issue_ids', type=int)
+    updates = {field: request.form.get(field, '').strip() for field in Issue.BULK_FIELDS}
+    updates = {field: value for field, value in updates.items() if value}
+
+    if not issue_ids:
+        flash('No issues selected.', 'warning')
+        return redirect(back)
+    if not updates:
+        flash('Choose at least one change to apply.', 'warning')
+        return redirect(back)
+    if len(issue_ids) > app.config['BULK_UPDATE_MAX']:
+        flash(f"Select at most {app.config['BULK_UPDATE_MAX']} issues at a time.", 'danger')
+        return redirect(back)
+
+    scope = issue_scope()
+    try:
+        updated = Issue.bulk_update(issue_ids, current_user.username, updates, scoped=bool(scope),
+                                    db_path=app.config['DATABASE_PATH'], **scope)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(back)
+    except Exception as e:
+        app.logger.error(f"Error bulk updating issues: {str(e)}")
+        flash(f'Error updating issues: {str(e)}', 'danger')
+        return redirect(back)
+
+    unchanged = len(set(issue_ids)) - updated
+    message = f'{updated} issue(s) updated.'
+    if unchanged:
+        message += f' {unchanged} skipped (already up to date or outside your department).'
+    flash(message, 'success' if updated else 'info')
+    return redirect(back)
+
+
 @app.route('/issue/<int:issue_id>/delete', methods=['POST'])
 @login_required
 @admin_required
@@ -476,9 +608,54 @@ def delete_issue(issue_id):
 @app.route('/audit-log')
 @login_required
 def audit_log():
-    """View complete audit log"""
-    logs = AuditLog.get_all()
-    return render_template('audit_log.html', logs=logs)
+    """View the audit log, one filtered page at a time"""
+    filters = {
+        'username': request.args.get('username', '').strip(),
+        'issue_id': request.args.get('issue_id', type=int),
+        'action': request.args.get('action', ''),
+        'field_name': request.args.get('field_name', ''),
+    }
+
+    # Date range (inclusive) applied to the stored 'YYYY-MM-DD HH:MM:SS' timestamps
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    try:
+        if date_from:
+            filters['since'] = datetime.strptime(date_from, '%Y-%m-%d').strftime('%Y-%m-%d')
+        if date_to:
+            filters['until'] = (datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    except ValueError:
+        flash('Invalid date range.', 'danger')
+        date_from = date_to = ''
+        filters.pop('since', None)
+        filters.pop('until', None)
+
+    page = AuditLog.paginate(filters=filters, page_size=app.config['AUDIT_LOG_PAGE_SIZE'],
+                             after=request.args.get('after'), before=request.args.get('before'))
+
+    # Query arguments that pagination links must carry over
+    query_args = {
+        'username': filters['username'] or None,
+        'issue_id': filters['issue_id'],
+        'action': filters['action'] or None,
+        'field_name': filters['field_name'] or None,
+        'date_from': date_from or None,
+        'date_to': date_to or None
+    }
+    pagination = {
+        'first_url': url_for('audit_log', **query_args) if page['prev_cursor'] else None,
+        'prev_url': url_for('audit_log', before=page['prev_cursor'], **query_args) if page['prev_cursor'] else None,
+        'next_url': url_for('audit_log', after=page['next_cursor'], **query_args) if page['next_cursor'] else None,
+    }
+
+    return render_template('audit_log.html',
+                           logs=page['logs'],
+                           pagination=pagination,
+                           filters=filters,
+                           date_from=date_from,
+                           date_to=date_to,
+                           actions=AuditLog.ACTIONS,
+                           field_names=AuditLog.FIELD_NAMES)
 
 
 @app.route('/users')
@@ -627,54 +804,73 @@ def delete_user(user_id):
 @app.route('/export/csv')
 @login_required
 def export_csv():
-    """Export issues to CSV"""
-    # Get issues based on user role
-    if current_user.is_admin():
-        issues = Issue.get_all()
-    else:
-        issues = Issue.get_all(
-            company=current_user.company,
-            department=current_user.department
-        )
-
-    # Create CSV in memory
-    si = StringIO()
-    writer = csv.writer(si)
+    """Export issues to CSV, streamed in batches, using the same filters as the tracker"""
+    filters, search_query, sort_keys = get_issue_filters()
+    batches = Issue.iter_query(filters=filters, search=search_query, sort=sort_keys,
+                               batch_size=app.config['EXPORT_BATCH_SIZE'], **issue_scope())
 
-    # Write header
-    writer.writerow(['ID', 'Title', 'Description', 'Company', 'Department', 'Application',
-                     'Category', 'Priority', 'Status', 'Created By',
-                     'Created At', 'Updated At'])
-
-    # Write data
-    for issue in issues:
-        writer.writerow([
-            issue['id'],
-            issue['title'],
-            issue['description'],
-            issue['company'] or '',
-            issue['department'] or '',
-            issue['application'] or '',
-            issue['category'],
-            issue['priority'],
-            issue['status'],
-            issue['created_by'],
-            issue['created_at'],
-            issue['updated_at']
-        ])
-
-    # Create response
-    output = si.getvalue()
-    si.close()
-
-    from flask import Response
     return Response(
-        output,
+        iter_csv(batches),
         mimetype='text/csv',
         headers={'Content-Disposition': 'attachment; filename=issues.csv'}
     )
 
 
+@app.route('/admin/jobs/export', methods=['POST'])
+@login_required
+@admin_required
+def export_csv_job():
+    """Queue a CSV export of the tracker's current filters as a background job (admin only)"""
+    filters, search_query, sort_keys = get_issue_filters()
+    job_id = JobQueue.enqueue('export_csv', {
+        'filters': filters,
+        'search': search_query,
+        'sort': sort_keys,
+        'scope': issue_scope()
+    }, created_by=current_user.username)
+    flash(f'Export queued as job #{job_id}. Download it here when it is done.', 'info')
+    return redirect(url_for('jobs'))
+
+
+@app.route('/admin/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_issues():
+    """Queue a bulk import of issues from a CSV or JSON file (admin only)"""
+    if request.method == 'POST':
+        file = request.files.get('import_file')
+        if not file or file.filename == '':
+            flash('No file selected.', 'danger')
+            return redirect(url_for('import_issues'))
+
+        import_format = IssueImport.detect_format(file.filename)
+        if import_format is None:
+            flash('Invalid file type. Please upload a .csv or .json file.', 'danger')
+            return redirect(url_for('import_issues'))
+
+        error = file.stream.finish()
+        if error:
+            flash(error, 'danger')
+            return redirect(url_for('import_issues'))
+
+        # Keep the file with the job files until the import job has used it
+        import tempfile
+        fd, import_path = tempfile.mkstemp(dir=app.config['JOB_FOLDER'], prefix='import_', suffix=f'.{import_format}')
+        os.close(fd)
+        file.stream.commit(import_path)
+
+        job_id = JobQueue.enqueue('import_issues', {
+            'path': import_path,
+            'format': import_format,
+            'filename': secure_filename(file.filename)
+        }, created_by=current_user.username)
+        flash(f'Import queued as job #{job_id}.', 'info')
+        return redirect(url_for('jobs'))
+
+    return render_template('import_issues.html', max_size=app.config['IMPORT_MAX_SIZE'],
+                           categories=Issue.CATEGORIES, priorities=Issue.PRIORITIES, statuses=Issue.STATUSES)
+
+
 @app.route('/issue/<int:issue_id>/upload', methods=['POST'])
 @login_required
 def upload_document(issue_id):
@@ -684,6 +880,10 @@ def upload_document(issue_id):
         flash('Issue not found.', 'danger')
         return redirect(url_for('dashboard'))
 
+    if not current_user.can_access_issue(issue):
+        flash('You do not have permission to upload documents to this issue.', 'danger')
+        return redirect(url_for('dashboard'))
+
     if 'document' not in request.files:
         flash('No file selected.', 'danger')
         return redirect(url_for('view_issue', issue_id=issue_id))
@@ -698,29 +898,75 @@ def upload_document(issue_id):
         flash('Only PDF files are allowed.', 'danger')
         return redirect(url_for('view_issue', issue_id=issue_id))
 
-    # Generate unique filename
+    # The upload was already written to a temporary file, hashed and checked while it arrived
+    error = file.stream.finish()
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for('view_issue', issue_id=issue_id))
+
+    # Store the content once; a file that is already stored is shared, not copied
     original_filename = secure_filename(file.filename)
-    file_extension = original_filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-
-    # Save file
-    file.save(file_path)
-    file_size = os.path.getsize(file_path)
-
-    # Save to database
-    Document.create(
-        issue_id=issue_id,
-        filename=unique_filename,
-        original_filename=original_filename,
-        file_size=file_size,
-        uploaded_by=current_user.username
-    )
+    Document.attach(issue_id, file.stream, original_filename, current_user.username, app.config['UPLOAD_FOLDER'])
 
     flash(f'Document "{original_filename}" uploaded successfully!', 'success')
     return redirect(url_for('view_issue', issue_id=issue_id))
 
 
+def send_document(document, as_attachment):
+    """
+    Send a document's file with a strong ETag, byte-range support and private
+    caching. A matching If-None-Match is answered with 304 before the file is
+    touched. With DOCUMENT_OFFLOAD set, the response only names the file and
+    the front-end web server sends it. Callers check access first.
+    """
+    # A document's content never changes: its hash (or id and size for files
+    # uploaded before hashing) identifies it exactly
+    etag = document['sha256'] or f"{document['id']}-{document['file_size']}"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], document['filename'])
+
+        if not os.path.exists(file_path):
+            flash('File not found on server.', 'danger')
+            return redirect(url_for('view_issue', issue_id=document['issue_id']))
+
+        offload = app.config['DOCUMENT_OFFLOAD']
+        if offload in ('x-accel-redirect', 'x-sendfile'):
+            # The web server sends the file (and handles Range requests itself)
+            response = Response(mimetype='application/pdf')
+            response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                                 filename=document['original_filename'])
+            if offload == 'x-accel-redirect':
+                prefix = app.config['DOCUMENT_OFFLOAD_PREFIX'].rstrip('/')
+                response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(document['filename'])}"
+            else:
+                response.headers['X-Sendfile'] = os.path.abspath(file_path)
+            response.set_etag(etag)
+        else:
+            # conditional=True answers Range and If-Range requests with 206 partial content
+            response = send_file(
+                file_path,
+                mimetype='application/pdf',
+                as_attachment=as_attachment,
+                download_name=document['original_filename'],
+                etag=etag,
+                conditional=True,
+                max_age=None
+            )
+            # Advertise ranges so PDF viewers can fetch pages incrementally
+            response.accept_ranges = 'bytes'
+
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['DOCUMENT_CACHE_MAX_AGE']
+    response.headers.pop('Expires', None)
+    return response
+
+
 @app.route('/document/<int:document_id>/download')
 @login_required
 def download_document(document_id):
@@ -730,18 +976,12 @@ def download_document(document_id):
         flash('Document not found.', 'danger')
         return redirect(url_for('dashboard'))
 
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], document['filename'])
-
-    if not os.path.exists(file_path):
-        flash('File not found on server.', 'danger')
-        return redirect(url_for('view_issue', issue_id=document['issue_id']))
+    issue = Issue.get_by_id(document['issue_id'])
+    if not issue or not current_user.can_access_issue(issue):
+        flash('You do not have permission to view this document.', 'danger')
+        return redirect(url_for('dashboard'))
 
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=document['original_filename'],
-        mimetype='application/pdf'
-    )
+    return send_document(document, as_attachment=True)
 
 
 @app.route('/document/<int:document_id>/view')
@@ -753,18 +993,12 @@ def view_document(document_id):
         flash('Document not found.', 'danger')
         return redirect(url_for('dashboard'))
 
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], document['filename'])
-
-    if not os.path.exists(file_path):
-        flash('File not found on server.', 'danger')
-        return redirect(url_for('view_issue', issue_id=document['issue_id']))
+    issue = Issue.get_by_id(document['issue_id'])
+    if not issue or not current_user.can_access_issue(issue):
+        flash('You do not have permission to view this document.', 'danger')
+        return redirect(url_for('dashboard'))
 
-    return send_file(
-        file_path,
-        mimetype='application/pdf',
-        as_attachment=False,
-        download_name=document['original_filename']
-    )
+    return send_document(document, as_attachment=False)
 
 
 @app.route('/document/<int:document_id>/delete', methods=['POST'])
@@ -778,14 +1012,9 @@ def delete_document(document_id):
         return redirect(url_for('dashboard'))
 
     issue_id = document['issue_id']
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], document['filename'])
-
-    # Delete file from filesystem
-    if os.path.exists(file_path):
-        os.remove(file_path)
 
-    # Delete from database
-    Document.delete(document_id)
+    # Delete the record; the file goes once no other document shares it
+    Document.delete(document_id, app.config['UPLOAD_FOLDER'])
 
     flash(f'Document "{document["original_filename"]}" deleted successfully!', 'success')
     return redirect(url_for('view_issue', issue_id=issue_id))
@@ -931,65 +1160,77 @@ def delete_application(application_id):
 @admin_required
 def manage_database():
     """Database management page (admin only)"""
-    import sqlite3
-
     # Get database statistics
-    conn = sqlite3.connect('issue_tracker.db')
-    cursor = conn.cursor()
+    cursor = get_db().cursor()
     cursor.execute('SELECT COUNT(*) FROM documents')
     doc_count = cursor.fetchone()[0]
-    conn.close()
 
     stats = {
-        'issues': len(Issue.get_all()),
+        'issues': Issue.count(),
         'users': len(User.get_all()),
         'companies': len(Company.get_all()),
         'documents': doc_count
     }
-    return render_template('manage_database.html', stats=stats)
+    stored_backups = [Backup.load_manifest(name) for name in Backup.list_manifests()[:10]]
+    return render_template('manage_database.html', stats=stats, cache_stats=result_cache.stats(),
+                           stored_backups=stored_backups)
 
 
-@app.route('/admin/database-backup')
+@app.route('/admin/cache-stats')
 @login_required
 @admin_required
-def database_backup():
-    """Backup database and uploads to ZIP file (admin only)"""
-    from datetime import datetime
-    import shutil
-    import zipfile
+def cache_stats():
+    """Result cache hit/miss counters for this worker (admin only)"""
+    return jsonify(result_cache.stats())
 
-    # Create backups directory if it doesn't exist
-    backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
 
-    # Generate backup filename with timestamp
+@app.route('/admin/database-backup')
+@login_required
+@admin_required
+def database_backup():
+    """Stream a backup ZIP of the database and uploads (admin only)"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     backup_filename = f'issue_tracker_backup_{timestamp}.zip'
-    backup_path = os.path.join(backup_dir, backup_filename)
-
-    # Create ZIP archive
-    with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Add database file
-        db_path = 'issue_tracker.db'
-        if os.path.exists(db_path):
-            zipf.write(db_path, 'issue_tracker.db')
-
-        # Add all files from uploads folder
-        uploads_dir = app.config['UPLOAD_FOLDER']
-        if os.path.exists(uploads_dir):
-            for root, dirs, files in os.walk(uploads_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # Store with relative path from uploads folder
-                    arcname = os.path.join('uploads', os.path.relpath(file_path, uploads_dir))
-                    zipf.write(file_path, arcname)
-
-    # Send the backup ZIP file to user
-    return send_file(
-        backup_path,
-        as_attachment=True,
-        download_name=backup_filename,
-        mimetype='application/zip'
+
+    # The ZIP is built while it is sent, from an online snapshot of the database
+    return Response(
+        Backup.stream(db.db_path, app.config['UPLOAD_FOLDER'], app.config['AUDIT_ARCHIVE_FOLDER']),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={backup_filename}'}
+    )
+
+
+@app.route('/admin/database-backup/incremental', methods=['POST'])
+@login_required
+@admin_required
+def database_backup_incremental():
+    """Save an incremental backup in the server's backup store (admin only)"""
+    try:
+        manifest = Backup.write_incremental(db.db_path, app.config['UPLOAD_FOLDER'],
+                                            app.config['AUDIT_ARCHIVE_FOLDER'], app.config['BACKUP_STORE_FOLDER'])
+        flash(f'Backup {manifest["name"]} saved: {len(manifest["files"])} file(s), '
+              f'{manifest["new_files"]} new since the previous backup.', 'success')
+    except Exception as e:
+        flash(f'Error saving backup: {str(e)}', 'danger')
+    return redirect(url_for('manage_database'))
+
+
+@app.route('/admin/database-backup/stored/<name>')
+@login_required
+@admin_required
+def database_backup_stored(name):
+    """Download a stored incremental backup as a ZIP (admin only)"""
+    store_dir = app.config['BACKUP_STORE_FOLDER']
+    manifest = Backup.load_manifest(name, store_dir)
+    if manifest is None:
+        flash('Backup not found.', 'danger')
+        return redirect(url_for('manage_database'))
+
+    backup_filename = f'issue_tracker_{os.path.splitext(name)[0]}.zip'
+    return Response(
+        Backup.stream_manifest(manifest, store_dir),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={backup_filename}'}
     )
 
 
@@ -997,7 +1238,7 @@ def database_backup():
 @login_required
 @admin_required
 def database_restore():
-    """Restore database and uploads from ZIP backup file (admin only)"""
+    """Queue a restore of the database and uploads from a ZIP backup file (admin only)"""
     if 'backup_file' not in request.files:
         flash('No backup file selected.', 'danger')
         return redirect(url_for('manage_database'))
@@ -1013,124 +1254,309 @@ def database_restore():
         flash('Invalid file type. Please upload a .zip backup file.', 'danger')
         return redirect(url_for('manage_database'))
 
-    try:
-        from datetime import datetime
-        import shutil
-        import zipfile
-        import tempfile
+    import zipfile
+    import tempfile
+
+    # Keep the upload with the job files until the restore job has used it
+    os.makedirs(app.config['JOB_FOLDER'], exist_ok=True)
+    fd, zip_path = tempfile.mkstemp(dir=app.config['JOB_FOLDER'], prefix='restore_', suffix='.zip')
+    os.close(fd)
+    file.save(zip_path)
+
+    # Check if database file exists in ZIP
+    valid = zipfile.is_zipfile(zip_path)
+    if valid:
+        with zipfile.ZipFile(zip_path) as zipf:
+            valid = Backup.DATABASE_ARCNAME in zipf.namelist()
+    if not valid:
+        os.remove(zip_path)
+        flash('Invalid backup file: database not found in archive.', 'danger')
+        return redirect(url_for('manage_database'))
 
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
+    job_id = JobQueue.enqueue('restore', {'zip_path': zip_path}, created_by=current_user.username)
+    flash(f'Restore queued as job #{job_id}. The current state is saved as a stored backup first; '
+          'you will be asked to log in again once it has finished.', 'info')
+    return redirect(url_for('jobs'))
 
-        # Create backup of current database and uploads before restoring
-        current_backup_filename = f'issue_tracker_pre_restore_{timestamp}.zip'
-        current_backup_path = os.path.join(backup_dir, current_backup_filename)
 
-        # Backup current state to ZIP
-        with zipfile.ZipFile(current_backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            db_path = 'issue_tracker.db'
-            if os.path.exists(db_path):
-                zipf.write(db_path, 'issue_tracker.db')
+@app.route('/admin/database-init', methods=['POST'])
+@login_required
+@admin_required
+def database_init():
+    """Queue a re-initialization of the database (admin only) - WARNING: This deletes all data!"""
+    confirmation = request.form.get('confirmation')
+
+    if confirmation != 'RESET DATABASE':
+        flash('Invalid confirmation. Please type "RESET DATABASE" exactly to confirm.', 'danger')
+        return redirect(url_for('manage_database'))
+
+    job_id = JobQueue.enqueue('reset', created_by=current_user.username)
+    flash(f'Database reset queued as job #{job_id}. A backup is created first; '
+          'log in again with the default admin account once it has finished.', 'warning')
+    return redirect(url_for('jobs'))
+
+
+@app.route('/admin/jobs/backup', methods=['POST'])
+@login_required
+@admin_required
+def database_backup_job():
+    """Queue a full backup ZIP as a background job (admin only)"""
+    job_id = JobQueue.enqueue('backup', created_by=current_user.username)
+    flash(f'Backup queued as job #{job_id}. Download it here when it is done.', 'info')
+    return redirect(url_for('jobs'))
+
+
+@app.route('/admin/jobs/cleanup-uploads', methods=['POST'])
+@login_required
+@admin_required
+def cleanup_uploads_job():
+    """Queue a clean-up of orphaned documents and upload files (admin only)"""
+    job_id = JobQueue.enqueue('cleanup_uploads', created_by=current_user.username)
+    flash(f'Clean-up queued as job #{job_id}.', 'info')
+    return redirect(url_for('jobs'))
+
+
+@app.route('/admin/jobs')
+@login_required
+@admin_required
+def jobs():
+    """Background job status and results (admin only)"""
+    job_list = JobQueue.get_recent()
+    active = any(job['status'] in ('queued', 'running') for job in job_list)
+    return render_template('jobs.html', jobs=job_list, active=active)
+
+
+@app.route('/admin/jobs/<int:job_id>')
+@login_required
+@admin_required
+def job_status(job_id):
+    """Status and progress of one background job as JSON (admin only)"""
+    job = JobQueue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    job.pop('result_path')
+    job.pop('params')
+    return jsonify(job)
+
+
+@app.route('/admin/jobs/<int:job_id>/download')
+@login_required
+@admin_required
+def job_download(job_id):
+    """Download a finished job's result file (admin only)"""
+    job = JobQueue.get(job_id)
+    if not job or job['status'] != 'done' or not job['result_path'] or not os.path.exists(job['result_path']):
+        flash('Job result not found.', 'danger')
+        return redirect(url_for('jobs'))
+
+    return send_file(job['result_path'], as_attachment=True, download_name=job['result_name'])
+
+
+@JobQueue.handler('backup')
+def run_backup_job(job, progress):
+    """Write a full backup ZIP into the job's folder"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_filename = f'issue_tracker_backup_{timestamp}.zip'
+    backup_path = os.path.join(JobQueue.job_dir(job['id']), backup_filename)
+
+    progress(0, 'Creating backup')
+    Backup.write(backup_path, db.db_path, app.config['UPLOAD_FOLDER'], app.config['AUDIT_ARCHIVE_FOLDER'],
+                 progress=lambda done, total: progress(done * 100 // total))
+    return {
+        'result_path': backup_path,
+        'result_name': backup_filename,
+        'message': f'Backup ready ({format_file_size(os.path.getsize(backup_path))})'
+    }
 
-            uploads_dir = app.config['UPLOAD_FOLDER']
-            if os.path.exists(uploads_dir):
-                for root, dirs, files in os.walk(uploads_dir):
-                    for filename in files:
-                        file_path = os.path.join(root, filename)
-                        arcname = os.path.join('uploads', os.path.relpath(file_path, uploads_dir))
-                        zipf.write(file_path, arcname)
-
-        # Save uploaded file to temporary location
-        temp_zip_path = os.path.join(tempfile.gettempdir(), f'restore_{timestamp}.zip')
-        file.save(temp_zip_path)
-
-        # Extract the backup ZIP
-        with zipfile.ZipFile(temp_zip_path, 'r') as zipf:
-            # Check if database file exists in ZIP
-            if 'issue_tracker.db' not in zipf.namelist():
-                os.remove(temp_zip_path)
-                flash('Invalid backup file: database not found in archive.', 'danger')
-                return redirect(url_for('manage_database'))
-
-            # Delete current database
-            db_path = 'issue_tracker.db'
-            if os.path.exists(db_path):
-                os.remove(db_path)
-
-            # Extract database
-            zipf.extract('issue_tracker.db', os.path.dirname(__file__))
+
+@JobQueue.handler('export_csv')
+def run_export_job(job, progress):
+    """Write a CSV export of the issues matching the job's filters into the job's folder"""
+    params = job['params']
+    total = Issue.count(filters=params['filters'], search=params['search'], **params['scope'])
+    batches = Issue.iter_query(filters=params['filters'], search=params['search'], sort=params['sort'],
+                               batch_size=app.config['EXPORT_BATCH_SIZE'], **params['scope'])
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    export_filename = f'issues_{timestamp}.csv'
+    export_path = os.path.join(JobQueue.job_dir(job['id']), export_filename)
+
+    def counted(batches):
+        """Pass batches through, reporting how many issues have been written"""
+        written = 0
+        try:
+            for issues in batches:
+                yield issues
+                written += len(issues)
+                progress(min(written * 100 // max(total, 1), 99))
+        finally:
+            batches.close()
+
+    progress(0, f'Exporting {total} issue(s)')
+    with open(export_path, 'w', newline='', encoding='utf-8') as target:
+        for chunk in iter_csv(counted(batches)):
+            target.write(chunk)
+    return {'result_path': export_path, 'result_name': export_filename, 'message': f'Exported {total} issue(s)'}
+
+
+@JobQueue.handler('restore')
+def run_restore_job(job, progress):
+    """Restore the database, uploads and audit archives from an uploaded backup ZIP"""
+    import shutil
+    import zipfile
+    import tempfile
+
+    zip_path = job['params']['zip_path']
+    try:
+        # Save the current database and uploads in the backup store before
+        # restoring (only files that changed since the last backup are copied)
+        progress(0, 'Saving the current state')
+        current_backup = Backup.write_incremental(db.db_path, app.config['UPLOAD_FOLDER'],
+                                                  app.config['AUDIT_ARCHIVE_FOLDER'], app.config['BACKUP_STORE_FOLDER'])
+
+        with zipfile.ZipFile(zip_path, 'r') as zipf:
+            # Copy the backed-up database into the live one through the backup API
+            progress(30, 'Restoring the database')
+            fd, temp_db_path = tempfile.mkstemp(suffix='.db', prefix='restore_')
+            os.close(fd)
+            try:
+                with zipf.open(Backup.DATABASE_ARCNAME) as source, open(temp_db_path, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                Backup.restore_database(temp_db_path, db.db_path)
+            finally:
+                os.remove(temp_db_path)
 
             # Clear and restore uploads folder
+            progress(50, 'Restoring uploaded documents')
             uploads_dir = app.config['UPLOAD_FOLDER']
             if os.path.exists(uploads_dir):
                 shutil.rmtree(uploads_dir)
             os.makedirs(uploads_dir, exist_ok=True)
 
             # Extract all files from uploads folder in the ZIP
+            members = [member for member in zipf.namelist()
+                       if member.startswith('uploads/') and not member.endswith('/')]
+            for index, member in enumerate(members):
+                # Extract into the configured uploads folder, never outside it
+                target_path = os.path.abspath(os.path.join(uploads_dir, member[len('uploads/'):]))
+                if os.path.commonpath([target_path, os.path.abspath(uploads_dir)]) != os.path.abspath(uploads_dir):
+                    continue
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                with zipf.open(member) as source, open(target_path, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                progress(50 + 40 * (index + 1) // len(members))
+
+            # Replace the archived audit log files with the ones in the backup
+            archive_dir = app.config['AUDIT_ARCHIVE_FOLDER']
+            for archive_path in AuditLog.list_archives(archive_dir):
+                os.remove(archive_path)
             for member in zipf.namelist():
-                if member.startswith('uploads/') and member != 'uploads/':
-                    # Extract to correct location
-                    target_path = os.path.join(os.path.dirname(__file__), member)
-                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                if member.startswith('archive/') and member != 'archive/':
+                    target_path = os.path.join(archive_dir, os.path.basename(member))
+                    os.makedirs(archive_dir, exist_ok=True)
                     with zipf.open(member) as source, open(target_path, 'wb') as target:
                         shutil.copyfileobj(source, target)
 
-        # Clean up temporary file
-        os.remove(temp_zip_path)
+        # Bring the restored database up to the current schema and reconcile
+        # the aggregate counters with the restored issues
+        progress(90, 'Updating the database schema')
+        db.init_db()
+        IssueCounters.rebuild()
+        Document.consolidate_storage(app.config['UPLOAD_FOLDER'])
+        # Log everyone out and drop every worker's cached results
+        DataGeneration.bump()
+        result_cache.clear()
+        user_cache.clear()
+    finally:
+        os.remove(zip_path)
 
-        flash(f'Database and uploads restored successfully! Previous state backed up to: {current_backup_filename}', 'success')
-        flash('Please log in again.', 'info')
+    return {'message': f'Database and uploads restored. Previous state saved as stored backup: {current_backup["name"]}'}
 
-        # Log out the user since the database was restored
-        logout_user()
-        return redirect(url_for('login'))
-
-    except Exception as e:
-        flash(f'Error restoring database: {str(e)}', 'danger')
-        return redirect(url_for('manage_database'))
 
+@JobQueue.handler('reset')
+def run_reset_job(job, progress):
+    """Re-initialize the database, keeping a copy of the old one in backups/"""
+    import shutil
 
-@app.route('/admin/database-init', methods=['POST'])
-@login_required
-@admin_required
-def database_init():
-    """Re-initialize database (admin only) - WARNING: This deletes all data!"""
-    confirmation = request.form.get('confirmation')
+    db_path = db.db_path
 
-    if confirmation != 'RESET DATABASE':
-        flash('Invalid confirmation. Please type "RESET DATABASE" exactly to confirm.', 'danger')
-        return redirect(url_for('manage_database'))
+    # Backup before deleting
+    backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_path = os.path.join(backup_dir, f'issue_tracker_pre_reset_{timestamp}.db')
+
+    progress(0, 'Backing up the database')
+    if os.path.exists(db_path):
+        # The uploads only survive in the backup store once the clean-up job
+        # removes files no document uses
+        Backup.write_incremental(db_path, app.config['UPLOAD_FOLDER'], app.config['AUDIT_ARCHIVE_FOLDER'],
+                                 app.config['BACKUP_STORE_FOLDER'])
+        close_db()
+        Backup.snapshot_database(db_path, backup_path)
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Set archived audit logs aside so they don't attach to the new issue ids
+    archives = AuditLog.list_archives(app.config['AUDIT_ARCHIVE_FOLDER'])
+    if archives:
+        archive_backup_dir = os.path.join(backup_dir, f'audit_archive_pre_reset_{timestamp}')
+        os.makedirs(archive_backup_dir, exist_ok=True)
+        for archive_path in archives:
+            shutil.move(archive_path, archive_backup_dir)
+
+    # Reinitialize database
+    progress(60, 'Creating a new database')
+    db.init_db()
+    DataGeneration.bump()
+    result_cache.clear()
+    user_cache.clear()
 
-    try:
-        # Close existing database connections
-        db_path = 'issue_tracker.db'
+    return {'message': f'Database reset. A backup was created at: {backup_path}'}
 
-        # Backup before deleting
-        from datetime import datetime
-        import shutil
-        backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(backup_dir, f'issue_tracker_pre_reset_{timestamp}.db')
 
-        if os.path.exists(db_path):
-            shutil.copy2(db_path, backup_path)
-            os.remove(db_path)
+@JobQueue.handler('import_issues')
+def run_import_job(job, progress):
+    """Import issues from an uploaded CSV/JSON file; rejected rows go into an error report"""
+    params = job['params']
+    try:
+        progress(0, f"Importing {params['filename']}")
+        report = IssueImport.run(params['path'], params['format'], job['created_by'],
+                                 progress=lambda done, total: progress(done * 100 // max(total, 1)))
+    finally:
+        os.remove(params['path'])
+
+    message = f"Imported {report['imported']} issue(s) from {params['filename']}"
+    if not report['rejected']:
+        return {'message': message}
+
+    errors_filename = f"import_errors_{job['id']}.csv"
+    errors_path = os.path.join(JobQueue.job_dir(job['id']), errors_filename)
+    IssueImport.write_errors(report, errors_path)
+    return {
+        'result_path': errors_path,
+        'result_name': errors_filename,
+        'message': f"{message}; {report['rejected']} row(s) rejected"
+    }
 
-        # Reinitialize database
-        db.init_db()
 
-        flash(f'Database reset successfully! A backup was created at: {backup_path}', 'warning')
-        flash('Please log in again with the default admin account.', 'info')
+@JobQueue.handler('cleanup_uploads')
+def run_cleanup_uploads_job(job, progress):
+    """Remove documents of deleted issues and upload files no document uses"""
+    progress(0, 'Scanning documents and uploaded files')
+    report = Document.collect_garbage(app.config['UPLOAD_FOLDER'], delete=True)
+    message = (f"Removed {report['orphan_documents']} orphaned document(s) and {report['removed_files']} "
+               f"unused file(s), {format_file_size(report['orphan_bytes'])} reclaimed")
+    if report['removed_files'] < report['orphan_files']:
+        message = (f"Removed {report['orphan_documents']} orphaned document(s); kept {report['orphan_files']} "
+                   f"unused file(s) ({format_file_size(report['orphan_bytes'])}) because there are no documents")
+    if report['missing_files']:
+        message += f"; {report['missing_files']} document file(s) missing"
+    return {'message': message}
 
-        # Log out the user since the database was reset
-        logout_user()
-        return redirect(url_for('login'))
 
-    except Exception as e:
-        flash(f'Error resetting database: {str(e)}', 'danger')
-        return redirect(url_for('manage_database'))
+JobQueue.schedule('cleanup_uploads', app.config['UPLOAD_CLEANUP_HOURS'] * 3600)
 
 
 @app.template_filter('datetime_format')
@@ -1158,6 +1584,14 @@ def datetime_format(value):
         return str(value) if value else '-'
 
 
+@app.template_filter('highlight')
+def highlight(value):
+    """Render search match markers from Issue queries as <mark> tags (HTML-escaped)"""
+    return (escape(value)
+            .replace(Issue.HIGHLIGHT_START, Markup('<mark>'))
+            .replace(Issue.HIGHLIGHT_END, Markup('</mark>')))
+
+
 @app.template_filter('filesize_format')
 def filesize_format(size_bytes):
     """Format file size in human readable format"""
@@ -1165,9 +1599,6 @@ def filesize_format(size_bytes):
 
 
 if __name__ == '__main__':
-    # Make sure database is initialized
-    db.init_db()
-
     # Get local IP address
     import socket
     try:
@@ -0,0 +1,49 @@
+"""
+Audit log archival script for IT Issue Tracker
+Moves audit log entries older than AUDIT_ARCHIVE_DAYS (or --days N) out of
+the live database into per-year archive files (archive/audit_log_YYYY.db).
+Archived entries still appear in each issue's history.
+Schedule it (e.g. monthly with Task Scheduler or cron) to keep the live
+audit_log table small.
+Usage: python archive_audit_log.py [--days N] [db_path]
+"""
+import sys
+from config import Config
+from models import AuditLog, Database, close_db
+
+
+def archive_audit_log(db_path=None, days=None):
+    """Archive old audit log entries and report what was moved"""
+    db = Database(db_path)
+    days = Config.AUDIT_ARCHIVE_DAYS if days is None else days
+    print(f"Archiving audit log entries older than {days} days from {db.db_path}...")
+
+    # Make sure the audit_log table and its indexes exist
+    db.init_db()
+
+    moved = AuditLog.archive(older_than_days=days, db_path=db.db_path)
+    if not moved:
+        print("✓ No audit log entries to archive")
+        return
+
+    for year, count in moved.items():
+        print(f"  {year}: {count} entr{'y' if count == 1 else 'ies'}")
+    print(f"✓ Archived {sum(moved.values())} audit log entries to {Config.AUDIT_ARCHIVE_FOLDER}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    days = None
+    if '--days' in args:
+        index = args.index('--days')
+        try:
+            days = int(args[index + 1])
+        except (IndexError, ValueError):
+            print("Usage: python archive_audit_log.py [--days N] [db_path]")
+            sys.exit(2)
+        del args[index:index + 2]
+
+    try:
+        archive_audit_log(args[0] if args else None, days)
+    finally:
+        close_db()
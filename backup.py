@@ -0,0 +1,314 @@
+"""
+Database backup helpers for IT Issue Tracker
+Takes consistent online snapshots of the live database with the SQLite backup
+API and streams backup ZIPs (database + uploads + audit archives) as they are
+built, without staging them on disk first. Incremental backups keep every file
+once in a content-addressed store and record each backup as a manifest.
+"""
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import zipfile
+from datetime import datetime
+from config import Config
+from models import AuditLog, get_db_connection
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable write target that hands the bytes written so far back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class Backup:
+    """Online database snapshots and streamed backup archives"""
+
+    # Name of the database inside backup ZIPs
+    DATABASE_ARCNAME = 'issue_tracker.db'
+
+    # Bytes read per chunk when adding files to a ZIP
+    CHUNK_SIZE = 1024 * 1024
+
+    # Already-compressed files are stored in ZIPs without deflating them again:
+    # everything in the uploads folder (PDFs, kept under their SHA-256 with no
+    # extension) and any other file with one of these extensions
+    STORED_PREFIXES = ('uploads/',)
+    STORED_EXTENSIONS = ('.pdf',)
+
+    @staticmethod
+    def snapshot_database(db_path, target_path, pages=None):
+        """
+        Copy the live database (including changes still in the WAL) to
+        target_path with the SQLite backup API. The copy runs in steps of
+        `pages` pages, each in its own short read transaction, so writers
+        keep going while the backup runs.
+        """
+        pages = pages or Config.BACKUP_PAGES_PER_STEP
+        source = get_db_connection(db_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def restore_database(source_path, db_path, pages=None):
+        """
+        Replace the contents of the live database with source_path through the
+        backup API, so open connections and the WAL stay consistent instead of
+        the file being swapped underneath them
+        """
+        pages = pages or Config.BACKUP_PAGES_PER_STEP
+        source = sqlite3.connect(source_path)
+        target = get_db_connection(db_path)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def folder_entries(folder, arcdir):
+        """List (path, arcname) pairs for every file below folder, in a stable order"""
+        entries = []
+        if os.path.exists(folder):
+            for root, dirs, files in os.walk(folder):
+                dirs.sort()
+                for filename in sorted(files):
+                    # Skip temporary files of uploads still in progress
+                    if filename.startswith('.upload_'):
+                        continue
+                    file_path = os.path.join(root, filename)
+                    arcname = os.path.join(arcdir, os.path.relpath(file_path, folder)).replace(os.sep, '/')
+                    entries.append((file_path, arcname))
+        return entries
+
+    @staticmethod
+    def iter_zip(entries, progress=None):
+        """
+        Build a ZIP of (path, arcname) entries, yielding its bytes as they are
+        produced. progress(done, total) is called after each entry.
+        """
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for index, (path, arcname) in enumerate(entries):
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                if arcname.startswith(Backup.STORED_PREFIXES) or arcname.lower().endswith(Backup.STORED_EXTENSIONS):
+                    info.compress_type = zipfile.ZIP_STORED
+                else:
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                with open(path, 'rb') as source, zipf.open(info, 'w') as target:
+                    while True:
+                        chunk = source.read(Backup.CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        data = stream.drain()
+                        if data:
+                            yield data
+                if progress:
+                    progress(index + 1, len(entries))
+        yield stream.drain()
+
+    @staticmethod
+    def stream(db_path, uploads_dir, archive_dir=None, progress=None):
+        """
+        Generate a full backup ZIP: a consistent snapshot of the database, the
+        uploads folder and the archived audit logs. The snapshot is written to
+        a temporary file, which is removed once the ZIP is finished.
+        """
+        fd, snapshot_path = tempfile.mkstemp(suffix='.db', prefix='backup_')
+        os.close(fd)
+        try:
+            Backup.snapshot_database(db_path, snapshot_path)
+
+            entries = [(snapshot_path, Backup.DATABASE_ARCNAME)]
+            entries.extend(Backup.folder_entries(uploads_dir, 'uploads'))
+            entries.extend((path, 'archive/' + os.path.basename(path))
+                           for path in AuditLog.list_archives(archive_dir))
+
+            yield from Backup.iter_zip(entries, progress)
+        finally:
+            os.remove(snapshot_path)
+
+    @staticmethod
+    def write(zip_path, db_path, uploads_dir, archive_dir=None, progress=None):
+        """Write a full backup ZIP to zip_path"""
+        with open(zip_path, 'wb') as target:
+            for data in Backup.stream(db_path, uploads_dir, archive_dir, progress):
+                target.write(data)
+
+    @staticmethod
+    def blob_path(store_dir, digest):
+        """Path of a stored file in the content-addressed store"""
+        return os.path.join(store_dir, 'blobs', digest[:2], digest)
+
+    @staticmethod
+    def store_blob(store_dir, path):
+        """
+        Add a file to the store under its SHA-256 and return the digest.
+        Content that is already stored is not written a second time.
+        """
+        os.makedirs(os.path.join(store_dir, 'blobs'), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(store_dir, 'blobs'), prefix='.incoming_')
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+                while True:
+                    chunk = source.read(Backup.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    target.write(chunk)
+
+            blob_path = Backup.blob_path(store_dir, digest.hexdigest())
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(temp_path, blob_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest.hexdigest()
+
+    @staticmethod
+    def list_manifests(store_dir=None):
+        """Get the names of the stored incremental backups, newest first"""
+        manifest_dir = os.path.join(store_dir or Config.BACKUP_STORE_FOLDER, 'manifests')
+        if not os.path.exists(manifest_dir):
+            return []
+        return sorted((name for name in os.listdir(manifest_dir) if name.endswith('.json')), reverse=True)
+
+    @staticmethod
+    def load_manifest(name, store_dir=None):
+        """Load a stored backup manifest by name (None if there is no such backup)"""
+        store_dir = store_dir or Config.BACKUP_STORE_FOLDER
+        if name not in Backup.list_manifests(store_dir):
+            return None
+        with open(os.path.join(store_dir, 'manifests', name), encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['name'] = name
+        return manifest
+
+    @staticmethod
+    def write_incremental(db_path, uploads_dir, archive_dir=None, store_dir=None):
+        """
+        Record an incremental backup: a database snapshot plus the uploads and
+        audit archives, each stored once by content hash. Files whose size and
+        modification time match the previous manifest reuse its hash without
+        being read, so the cost scales with what changed. Returns the manifest.
+        """
+        store_dir = store_dir or Config.BACKUP_STORE_FOLDER
+        os.makedirs(os.path.join(store_dir, 'manifests'), exist_ok=True)
+
+        previous = {}
+        manifests = Backup.list_manifests(store_dir)
+        if manifests:
+            previous = Backup.load_manifest(manifests[0], store_dir)['files']
+
+        fd, snapshot_path = tempfile.mkstemp(suffix='.db', prefix='backup_')
+        os.close(fd)
+        try:
+            Backup.snapshot_database(db_path, snapshot_path)
+            database = Backup.store_blob(store_dir, snapshot_path)
+            database_size = os.path.getsize(snapshot_path)
+        finally:
+            os.remove(snapshot_path)
+
+        entries = Backup.folder_entries(uploads_dir, 'uploads')
+        entries.extend((path, 'archive/' + os.path.basename(path))
+                       for path in AuditLog.list_archives(archive_dir))
+
+        files = {}
+        new_files = 0
+        new_bytes = 0
+        for path, arcname in entries:
+            stat = os.stat(path)
+            known = previous.get(arcname)
+            if (known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns
+                    and os.path.exists(Backup.blob_path(store_dir, known['hash']))):
+                digest = known['hash']
+            else:
+                digest = Backup.store_blob(store_dir, path)
+                new_files += 1
+                new_bytes += stat.st_size
+            files[arcname] = {'hash': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        manifest = {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': database,
+            'database_size': database_size,
+            'files': files,
+            'new_files': new_files,
+            'new_bytes': new_bytes
+        }
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        name = f'backup_{timestamp}.json'
+        suffix = 1
+        while os.path.exists(os.path.join(store_dir, 'manifests', name)):
+            name = f'backup_{timestamp}_{suffix}.json'
+            suffix += 1
+
+        # Write the manifest last and atomically, once every blob it names exists
+        manifest_path = os.path.join(store_dir, 'manifests', name)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+        manifest['name'] = name
+        return manifest
+
+    @staticmethod
+    def stream_manifest(manifest, store_dir=None):
+        """Generate a backup ZIP (same layout as a full backup) from a stored backup"""
+        store_dir = store_dir or Config.BACKUP_STORE_FOLDER
+        entries = [(Backup.blob_path(store_dir, manifest['database']), Backup.DATABASE_ARCNAME)]
+        entries.extend((Backup.blob_path(store_dir, entry['hash']), arcname)
+                       for arcname, entry in sorted(manifest['files'].items()))
+        return Backup.iter_zip(entries)
+
+    @staticmethod
+    def prune(keep, store_dir=None):
+        """
+        Delete all but the newest `keep` stored backups, then every blob no
+        remaining manifest refers to. Returns (manifests removed, blobs removed).
+        """
+        store_dir = store_dir or Config.BACKUP_STORE_FOLDER
+        manifests = Backup.list_manifests(store_dir)
+        removed = manifests[keep:]
+        for name in removed:
+            os.remove(os.path.join(store_dir, 'manifests', name))
+
+        referenced = set()
+        for name in manifests[:keep]:
+            manifest = Backup.load_manifest(name, store_dir)
+            referenced.add(manifest['database'])
+            referenced.update(entry['hash'] for entry in manifest['files'].values())
+
+        blobs_removed = 0
+        blob_root = os.path.join(store_dir, 'blobs')
+        if os.path.exists(blob_root):
+            for root, dirs, files in os.walk(blob_root):
+                for filename in files:
+                    if filename not in referenced and not filename.startswith('.incoming_'):
+                        os.remove(os.path.join(root, filename))
+                        blobs_removed += 1
+        return len(removed), blobs_removed
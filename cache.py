@@ -0,0 +1,157 @@
+"""
+In-process result cache for IT Issue Tracker
+Caches dashboard and tracker query results per user scope with LRU and TTL
+eviction. Issue writes invalidate only the company/department scope they touch.
+Logged-in users are cached by id for the user loader. Reference data
+(companies, departments, applications) is cached until its version row changes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and scope-based invalidation"""
+
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(scope, route, args):
+        """
+        Build a cache key from a (company, department) scope, a route name and
+        query arguments. Arguments are normalized so their order and empty
+        values don't produce distinct entries.
+        """
+        company, department = scope
+        normalized = tuple(sorted(
+            (name, tuple(value) if isinstance(value, (list, tuple)) else value)
+            for name, value in args.items() if value not in (None, '')
+        ))
+        return (company or None, department or None), route, normalized
+
+    def get(self, key):
+        """Get a cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries if full"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, compute):
+        """Get a cached value, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_scope(self, company, department):
+        """
+        Drop every entry that can contain issues from this company/department:
+        entries cached for that exact scope, for the whole company, and for
+        unrestricted (admin) scopes.
+        """
+        company = company or None
+        department = department or None
+        with self._lock:
+            stale = [key for key in self._entries
+                     if key[0][0] in (None, company) and key[0][1] in (None, department)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop all entries (e.g. after a restore or reset)"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss counters and current size for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+class VersionedCache:
+    """
+    Thread-safe cache whose entries are tagged with a data version. A lookup
+    with a different version is a miss, so a cheap version check is enough to
+    notice changes made by other processes.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """Get the value cached for this version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        """Store a value for this version, replacing any older one"""
+        with self._lock:
+            self._entries[key] = (version, value)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared cache for dashboard and tracker results in this process
+result_cache = ResultCache(Config.RESULT_CACHE_SIZE, Config.RESULT_CACHE_TTL)
+
+# Logged-in users by id for the Flask-Login user loader (never holds password hashes)
+user_cache = ResultCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL)
+
+# Companies, departments and applications, checked against data_versions
+reference_cache = VersionedCache()
@@ -0,0 +1,49 @@
+"""
+Upload clean-up script for IT Issue Tracker
+Finds documents whose issue was deleted and files in the uploads folder that
+no document uses (left behind by deleted issues, failed uploads or restores),
+and reports the space they take. With --delete they are removed.
+When UPLOAD_CLEANUP_HOURS is set to a positive value, the web app also
+schedules this clean-up as a job at that interval.
+Usage: python cleanup_uploads.py [--delete] [db_path]
+"""
+import sys
+from config import Config
+from models import Database, Document, close_db
+
+
+def cleanup_uploads(db_path=None, delete=False):
+    """Report (or remove) orphaned documents and upload files"""
+    db = Database(db_path)
+    print(f"Checking documents of {db.db_path} against {Config.UPLOAD_FOLDER}...")
+
+    # Make sure the documents indexes exist
+    db.init_db()
+
+    report = Document.collect_garbage(Config.UPLOAD_FOLDER, delete=delete, db_path=db.db_path)
+    size_mb = report['orphan_bytes'] / (1024 * 1024)
+    if report['missing_files']:
+        print(f"  {report['missing_files']} document file(s) missing from the uploads folder")
+
+    if delete and report['removed_files'] < report['orphan_files']:
+        print(f"✓ Removed {report['orphan_documents']} orphaned document(s); kept {report['orphan_files']} "
+              f"unused file(s) ({size_mb:.1f} MB) because the database has no documents")
+    elif delete:
+        print(f"✓ Removed {report['orphan_documents']} orphaned document(s) and "
+              f"{report['removed_files']} unused file(s) ({size_mb:.1f} MB reclaimed)")
+    else:
+        print(f"  {report['orphan_documents']} orphaned document(s), "
+              f"{report['orphan_files']} unused file(s) ({size_mb:.1f} MB)")
+        print("✓ Nothing removed; run with --delete to remove them")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    delete = '--delete' in args
+    if delete:
+        args.remove('--delete')
+
+    try:
+        cleanup_uploads(args[0] if args else None, delete)
+    finally:
+        close_db()
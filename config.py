@@ -21,6 +21,77 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'pdf'}
 
+    # Browser cache lifetime for downloaded/viewed documents. A document's
+    # content never changes, so it is cached privately (never by shared
+    # proxies) and revalidated with its ETag afterwards.
+    DOCUMENT_CACHE_MAX_AGE = int(os.environ.get('DOCUMENT_CACHE_MAX_AGE', 30 * 24 * 3600))  # seconds
+
+    # Let the front-end web server send document files once the app has
+    # authorized the request: '' (the app streams the file), 'x-accel-redirect'
+    # (nginx; DOCUMENT_OFFLOAD_PREFIX must be an `internal` location aliased to
+    # UPLOAD_FOLDER) or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+    DOCUMENT_OFFLOAD = os.environ.get('DOCUMENT_OFFLOAD', '').lower()
+    DOCUMENT_OFFLOAD_PREFIX = os.environ.get('DOCUMENT_OFFLOAD_PREFIX', '/protected-uploads/')
+
+    # Issue tracker pagination
+    TRACKER_PAGE_SIZES = (25, 50, 100, 200)
+    TRACKER_PAGE_SIZE = 50
+
+    # Audit log browser page size
+    AUDIT_LOG_PAGE_SIZE = 100
+
+    # Audit log archival: entries older than AUDIT_ARCHIVE_DAYS are moved into
+    # per-year SQLite files (audit_log_YYYY.db) in AUDIT_ARCHIVE_FOLDER
+    AUDIT_ARCHIVE_FOLDER = os.environ.get('AUDIT_ARCHIVE_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+    AUDIT_ARCHIVE_DAYS = int(os.environ.get('AUDIT_ARCHIVE_DAYS', 365))
+
+    # Database pages copied per step of an online backup (4 MB with 4 KB pages);
+    # writers can commit between steps
+    BACKUP_PAGES_PER_STEP = 1024
+
+    # Content-addressed store for incremental backups (manifests + blobs)
+    BACKUP_STORE_FOLDER = os.environ.get('BACKUP_STORE_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups', 'store')
+
+    # Background jobs (backups, restores, resets, large exports). The queue has
+    # its own database so restores never touch it; results are kept for
+    # JOB_RETENTION_DAYS. Set JOB_WORKER_THREADS=0 to run jobs only in a
+    # separate `python job_worker.py` process.
+    JOB_FOLDER = os.environ.get('JOB_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs')
+    JOB_DATABASE_PATH = os.environ.get('JOB_DATABASE_PATH') or os.path.join(JOB_FOLDER, 'jobs.db')
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 1))
+    JOB_POLL_INTERVAL = 2  # seconds
+    # A running job's worker records a heartbeat every JOB_HEARTBEAT_SECONDS;
+    # a job without one for JOB_STALE_SECONDS is failed as interrupted
+    JOB_HEARTBEAT_SECONDS = 30
+    JOB_STALE_SECONDS = 300
+    JOB_RETENTION_DAYS = 7
+
+    # Hours between automatic clean-ups of orphaned documents and upload files
+    # (a background job). Off unless set; otherwise run cleanup_uploads.py or
+    # use the Database page.
+    UPLOAD_CLEANUP_HOURS = int(os.environ.get('UPLOAD_CLEANUP_HOURS', 0))
+
+    # Rows fetched per batch when streaming CSV exports
+    EXPORT_BATCH_SIZE = 500
+
+    # Bulk issue import (/admin/import, import_issues.py): largest accepted
+    # upload, issues inserted per transaction and rejected rows listed
+    IMPORT_MAX_SIZE = int(os.environ.get('IMPORT_MAX_SIZE', 256 * 1024 * 1024))  # bytes
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_MAX_ERRORS = 10000
+
+    # Most issues changed by one tracker bulk update
+    BULK_UPDATE_MAX = 500
+
+    # In-process dashboard/tracker result cache (per worker)
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+    RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 30))  # seconds
+
+    # Per-worker cache of logged-in users for the login user loader. Role
+    # changes and deletions made on another worker apply within the TTL.
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))  # seconds
+
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
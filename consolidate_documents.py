@@ -0,0 +1,37 @@
+"""
+Document storage consolidation script for IT Issue Tracker
+Moves documents uploaded before shared storage (one UUID-named file per
+upload) into the content-addressed layout (uploads/ab/cd/<sha256>), so
+identical PDFs attached to several issues are kept on disk only once.
+Safe to run more than once; documents already in shared storage are skipped.
+Usage: python consolidate_documents.py [db_path]
+"""
+import sys
+from config import Config
+from models import Database, Document, close_db
+
+
+def consolidate_documents(db_path=None):
+    """Move old uploads into shared storage and report the space saved"""
+    db = Database(db_path)
+    print(f"Consolidating documents of {db.db_path} in {Config.UPLOAD_FOLDER}...")
+
+    # Make sure the sha256 column and the document_blobs table exist
+    db.init_db()
+
+    moved, duplicates, freed, missing = Document.consolidate_storage(Config.UPLOAD_FOLDER, db.db_path)
+    if missing:
+        print(f"  {missing} document(s) skipped: file not found")
+    if not moved:
+        print("✓ All documents are already in shared storage")
+        return
+
+    print(f"✓ Moved {moved} document(s) to shared storage, removed {duplicates} duplicate file(s) "
+          f"({freed / (1024 * 1024):.1f} MB freed)")
+
+
+if __name__ == '__main__':
+    try:
+        consolidate_documents(sys.argv[1] if len(sys.argv) > 1 else None)
+    finally:
+        close_db()
@@ -0,0 +1,149 @@
+"""
+Dashboard statistics for IT Issue Tracker
+Computes the dashboard KPIs and chart data from the trigger-maintained
+issue_counters table (or GROUP BY queries on issues when it is missing),
+so the cost depends on the number of groups rather than the number of issues
+"""
+from models import Issue, IssueCounters, get_db
+
+
+class DashboardStats:
+    """Aggregated issue statistics for the dashboard"""
+
+    # Statuses shown on the dashboard charts (closed issues are excluded)
+    CHART_STATUSES = ['Not Started', 'In Progress', 'Resolved']
+
+    # Number of companies shown in the company chart
+    TOP_COMPANIES = 10
+
+    @staticmethod
+    def active_filters():
+        """Filters selecting every issue that is not closed"""
+        return {'status': [s for s in Issue.STATUSES if s != 'Closed']}
+
+    @staticmethod
+    def get(company=None, department=None, db_path=None):
+        """
+        Get (kpi, chart_data) for the dashboard, restricted to the given
+        company/department scope (None for all issues)
+        """
+        if IssueCounters.exists(get_db(db_path)):
+            groups = DashboardStats.get_counter_groups(company, department, db_path)
+            companies = DashboardStats.get_counter_top_companies(company, department, db_path)
+        else:
+            groups = DashboardStats.get_groups(company, department, db_path)
+            companies = DashboardStats.get_top_companies(company, department, db_path)
+        return DashboardStats.build(groups, companies)
+
+    @staticmethod
+    def counter_where(company=None, department=None):
+        """Build the WHERE clause selecting active counters within a scope"""
+        conditions = ["status != 'Closed'"]
+        params = []
+        if company:
+            conditions.append('company = ?')
+            params.append(company)
+        if department:
+            conditions.append('department = ?')
+            params.append(department)
+        return ' WHERE ' + ' AND '.join(conditions), params
+
+    @staticmethod
+    def get_counter_groups(company=None, department=None, db_path=None):
+        """Read active issue counts by status x priority x category from issue_counters"""
+        cursor = get_db(db_path).cursor()
+
+        where, params = DashboardStats.counter_where(company, department)
+        cursor.execute(f'''
+            SELECT status, priority, category, SUM(issue_count) AS total
+            FROM issue_counters{where}
+            GROUP BY status, priority, category
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_counter_top_companies(company=None, department=None, db_path=None):
+        """Read per-company status counts for the busiest companies from issue_counters"""
+        cursor = get_db(db_path).cursor()
+
+        where, params = DashboardStats.counter_where(company, department)
+        cursor.execute(f'''
+            SELECT IFNULL(NULLIF(company, ''), 'Unassigned') AS company,
+                   SUM(CASE WHEN status = 'Not Started' THEN issue_count ELSE 0 END) AS not_started,
+                   SUM(CASE WHEN status = 'In Progress' THEN issue_count ELSE 0 END) AS in_progress,
+                   SUM(CASE WHEN status = 'Resolved' THEN issue_count ELSE 0 END) AS resolved
+            FROM issue_counters{where}
+            GROUP BY IFNULL(NULLIF(company, ''), 'Unassigned')
+            ORDER BY not_started + in_progress + resolved DESC, company
+            LIMIT ?
+        ''', params + [DashboardStats.TOP_COMPANIES])
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_groups(company=None, department=None, db_path=None):
+        """Count active issues grouped by status x priority x category"""
+        cursor = get_db(db_path).cursor()
+
+        where, params = Issue.build_where(DashboardStats.active_filters(), company=company, department=department)
+        cursor.execute(f'''
+            SELECT issues.status, issues.priority, issues.category, COUNT(*) AS total
+            FROM issues{where}
+            GROUP BY issues.status, issues.priority, issues.category
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_top_companies(company=None, department=None, db_path=None):
+        """Count active issues per company and status for the busiest companies"""
+        cursor = get_db(db_path).cursor()
+
+        where, params = Issue.build_where(DashboardStats.active_filters(), company=company, department=department)
+        cursor.execute(f'''
+            SELECT IFNULL(NULLIF(issues.company, ''), 'Unassigned') AS company,
+                   SUM(issues.status = 'Not Started') AS not_started,
+                   SUM(issues.status = 'In Progress') AS in_progress,
+                   SUM(issues.status = 'Resolved') AS resolved
+            FROM issues{where}
+            GROUP BY IFNULL(NULLIF(issues.company, ''), 'Unassigned')
+            ORDER BY not_started + in_progress + resolved DESC, company
+            LIMIT ?
+        ''', params + [DashboardStats.TOP_COMPANIES])
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def build(groups, companies):
+        """
+        Build the kpi and chart_data dicts used by dashboard.html from
+        (status, priority, category, total) groups and per-company counts
+        """
+        status_counts = {}
+        priority_counts = {}
+        category_counts = {}
+        for group in groups:
+            status_counts[group['status']] = status_counts.get(group['status'], 0) + group['total']
+            priority_counts[group['priority']] = priority_counts.get(group['priority'], 0) + group['total']
+            category_counts[group['category']] = category_counts.get(group['category'], 0) + group['total']
+
+        kpi = {
+            'total_issues': sum(status_counts.values()),
+            'open_issues': status_counts.get('Not Started', 0),
+            'in_progress_issues': status_counts.get('In Progress', 0),
+            'resolved_issues': status_counts.get('Resolved', 0)
+        }
+
+        category_labels = [c for c in Issue.CATEGORIES if category_counts.get(c)]
+
+        chart_data = {
+            'status_labels': DashboardStats.CHART_STATUSES,
+            'status_values': [status_counts.get(s, 0) for s in DashboardStats.CHART_STATUSES],
+            'priority_labels': list(Issue.PRIORITIES),
+            'priority_values': [priority_counts.get(p, 0) for p in Issue.PRIORITIES],
+            'category_labels': category_labels,
+            'category_values': [category_counts[c] for c in category_labels],
+            'company_labels': [c['company'] for c in companies],
+            'company_not_started': [c['not_started'] for c in companies],
+            'company_in_progress': [c['in_progress'] for c in companies],
+            'company_resolved': [c['resolved'] for c in companies]
+        }
+
+        return kpi, chart_data
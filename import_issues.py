@@ -0,0 +1,68 @@
+"""
+Bulk issue import script for IT Issue Tracker
+Imports issues from a CSV file (same columns as the CSV export) or a JSON file
+(an array of objects, or one object per line), e.g. when migrating from
+another ticket system. Invalid rows are listed and skipped; the others are
+imported in chunked transactions.
+Usage: python import_issues.py [--user USERNAME] [--errors errors.csv] file [db_path]
+"""
+import sys
+import time
+from issue_import import IssueImport
+from models import Database, close_db
+
+
+def import_issues(path, db_path=None, username='admin', errors_path=None):
+    """Import issues from a file and report the rows that were rejected"""
+    import_format = IssueImport.detect_format(path)
+    if import_format is None:
+        print(f"Error: {path} is not a .csv or .json file")
+        return False
+
+    db = Database(db_path)
+    print(f"Importing {path} into {db.db_path} as {username}...")
+
+    # Make sure the tables, triggers and indexes exist
+    db.init_db()
+
+    started = time.monotonic()
+    try:
+        report = IssueImport.run(path, import_format, username, db_path=db.db_path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+
+    for location, error in report['errors'][:20]:
+        print(f"  {location}: {error}")
+    if report['rejected'] > 20:
+        print(f"  ... and {report['rejected'] - 20} more")
+    if errors_path and report['rejected']:
+        IssueImport.write_errors(report, errors_path)
+        print(f"  Rejected rows written to {errors_path}")
+
+    print(f"✓ Imported {report['imported']} issue(s) in {time.monotonic() - started:.1f}s, "
+          f"{report['rejected']} row(s) rejected")
+    return True
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    options = {'--user': 'admin', '--errors': None}
+    for option in options:
+        if option in args:
+            index = args.index(option)
+            if index + 1 >= len(args):
+                args = []
+                break
+            options[option] = args[index + 1]
+            del args[index:index + 2]
+
+    if not args:
+        print("Usage: python import_issues.py [--user USERNAME] [--errors errors.csv] file [db_path]")
+        sys.exit(2)
+
+    try:
+        ok = import_issues(args[0], args[1] if len(args) > 1 else None, options['--user'], options['--errors'])
+    finally:
+        close_db()
+    sys.exit(0 if ok else 1)
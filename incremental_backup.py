@@ -0,0 +1,48 @@
+"""
+Incremental backup script for IT Issue Tracker
+Records a backup in the content-addressed store (BACKUP_STORE_FOLDER): a
+database snapshot plus only the uploads and audit archives that are new since
+the previous backup. Schedule it instead of copying the whole folder.
+Usage: python incremental_backup.py [--keep N] [db_path]
+"""
+import os
+import sys
+from backup import Backup
+from config import Config
+from models import Database
+
+
+def incremental_backup(db_path=None, keep=None):
+    """Record an incremental backup and optionally prune old ones"""
+    db = Database(db_path)
+    if not os.path.exists(db.db_path):
+        print(f"Error: database {db.db_path} not found")
+        return False
+    print(f"Backing up {db.db_path} to {Config.BACKUP_STORE_FOLDER}...")
+
+    manifest = Backup.write_incremental(db.db_path, Config.UPLOAD_FOLDER, Config.AUDIT_ARCHIVE_FOLDER)
+    print(f"✓ Saved backup {manifest['name']}: {len(manifest['files'])} file(s), "
+          f"{manifest['new_files']} new ({manifest['new_bytes']} bytes)")
+
+    if keep is not None:
+        manifests_removed, blobs_removed = Backup.prune(keep)
+        print(f"✓ Kept the newest {keep} backup(s): removed {manifests_removed} backup(s) "
+              f"and {blobs_removed} unreferenced file(s)")
+    return True
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    keep = None
+    if '--keep' in args:
+        index = args.index('--keep')
+        try:
+            keep = int(args[index + 1])
+        except (IndexError, ValueError):
+            keep = 0
+        if keep < 1:
+            print("Usage: python incremental_backup.py [--keep N] [db_path]")
+            sys.exit(2)
+        del args[index:index + 2]
+
+    sys.exit(0 if incremental_backup(args[0] if args else None, keep) else 1)
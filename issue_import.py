@@ -0,0 +1,309 @@
+"""
+Bulk issue import for IT Issue Tracker
+Reads issues from a CSV file (the export format, or any file with the same
+column names) or a JSON file (an array of objects, or one object per line)
+without loading it into memory, validates each row and inserts the valid ones
+in chunked transactions. Invalid rows are reported with their line or record
+number and don't stop the import.
+"""
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime
+from config import Config
+from models import Issue
+
+
+class IssueImport:
+    """Streaming CSV/JSON parsing, validation and chunked insertion of issues"""
+
+    FORMATS = ('csv', 'json')
+
+    # Fields read from each row; 'id' and unknown columns are ignored
+    FIELDS = ('title', 'description', 'company', 'department', 'application', 'category', 'priority',
+              'status', 'assigned_to', 'created_by', 'created_at', 'updated_at')
+    REQUIRED = ('title', 'description', 'category', 'priority')
+
+    TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+    # Characters decoded per read when parsing JSON
+    READ_SIZE = 64 * 1024
+
+    # Largest JSON record (one line or array element) parsed; longer ones are rejected
+    MAX_RECORD_SIZE = 1024 * 1024
+
+    # Characters that matter when splitting a JSON array: inside and outside strings
+    _STRING_CHARS = re.compile(r'["\\]')
+    _STRUCTURE_CHARS = re.compile(r'["\[\]{},]')
+
+    @staticmethod
+    def detect_format(filename):
+        """Get the import format from a file name (None if it isn't supported)"""
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension == 'csv':
+            return 'csv'
+        if extension in ('json', 'jsonl', 'ndjson'):
+            return 'json'
+        return None
+
+    @staticmethod
+    def _normalize_key(key):
+        """'Created By' (export header) -> 'created_by'"""
+        return str(key).strip().lower().replace(' ', '_')
+
+    @staticmethod
+    def read_csv(binary_file):
+        """Yield (location, row dict, None) for each CSV row; the header row names the fields"""
+        text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            reader = csv.reader(text)
+            header = next(reader, None)
+            if header is None:
+                return
+            keys = [IssueImport._normalize_key(column) for column in header]
+            missing = [field for field in IssueImport.REQUIRED if field not in keys]
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+            for values in reader:
+                if not any(value.strip() for value in values):
+                    continue
+                yield f'line {reader.line_num}', dict(zip(keys, values)), None
+        finally:
+            # Leave the binary file open for the caller
+            text.detach()
+
+    @staticmethod
+    def read_json(binary_file):
+        """
+        Yield (location, object, error) for each element of a JSON array, or
+        each line of a file with one object per line. A record that isn't
+        valid JSON, or is over MAX_RECORD_SIZE characters, is yielded with an
+        error and the rest of the file is still read.
+        """
+        text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', errors='replace')
+        try:
+            # An array starts with '['; anything else is read as one object per line
+            head = text.read(IssueImport.READ_SIZE).lstrip()
+            text.seek(0)
+            if head.startswith('['):
+                records = IssueImport._array_elements(text)
+            else:
+                records = IssueImport._lines(text)
+
+            for location, source in records:
+                if source is None:
+                    yield location, None, f'Record is too large (over {IssueImport.MAX_RECORD_SIZE} characters)'
+                    continue
+                try:
+                    yield location, json.loads(source), None
+                except json.JSONDecodeError as e:
+                    yield location, None, f'Invalid JSON: {e.msg} (column {e.colno})'
+        finally:
+            text.detach()
+
+    @staticmethod
+    def _lines(text):
+        """Yield (location, source) for each non-blank line; source is None for an oversized line"""
+        line_number = 0
+        while True:
+            line = text.readline(IssueImport.MAX_RECORD_SIZE + 1)
+            if line == '':
+                return
+            line_number += 1
+            if len(line) > IssueImport.MAX_RECORD_SIZE and not line.endswith('\n'):
+                # Skip the rest of the line without keeping it
+                while line and not line.endswith('\n'):
+                    line = text.readline(IssueImport.READ_SIZE)
+                yield f'line {line_number}', None
+            elif line.strip():
+                yield f'line {line_number}', line
+
+    @staticmethod
+    def _array_elements(text):
+        """
+        Yield (location, source) for each element of the top-level JSON array,
+        splitting on the commas outside strings and nested values. Only the
+        current element is kept in memory; source is None for an oversized one.
+        """
+        record = 0
+        depth = 0
+        in_string = False
+        escaped = False
+        parts = []
+        size = 0
+
+        def element():
+            return ''.join(parts) if size <= IssueImport.MAX_RECORD_SIZE else None
+
+        chunk = text.read(IssueImport.READ_SIZE)
+        # The caller checked that the first non-blank character is the opening '['
+        position = start = chunk.index('[') + 1
+        while chunk:
+            while position < len(chunk):
+                if escaped:
+                    # Skip the character after a backslash that ended the previous chunk
+                    escaped = False
+                    position += 1
+                    continue
+
+                if in_string:
+                    match = IssueImport._STRING_CHARS.search(chunk, position)
+                    if match is None:
+                        break
+                    position = match.end()
+                    if match.group() == '"':
+                        in_string = False
+                    else:
+                        escaped = True
+                    continue
+
+                match = IssueImport._STRUCTURE_CHARS.search(chunk, position)
+                if match is None:
+                    break
+                char = match.group()
+                position = match.end()
+                if char == '"':
+                    in_string = True
+                elif char in '[{':
+                    depth += 1
+                elif depth:
+                    if char != ',':
+                        depth -= 1
+                elif char in ',]':
+                    # End of an element at the top level of the array
+                    if size <= IssueImport.MAX_RECORD_SIZE:
+                        parts.append(chunk[start:match.start()])
+                    size += match.start() - start
+                    source = element()
+                    if source is None or source.strip():
+                        record += 1
+                        yield f'record {record}', source
+                    if char == ']':
+                        return
+                    parts = []
+                    size = 0
+                    start = position
+
+            # Keep the rest of the chunk for the element in progress, unless it is already too large
+            size += len(chunk) - start
+            parts = parts + [chunk[start:]] if size <= IssueImport.MAX_RECORD_SIZE else []
+            chunk = text.read(IssueImport.READ_SIZE)
+            position = start = 0
+
+        # Unterminated array: the last element is reported as invalid JSON
+        source = element()
+        if source is None or source.strip():
+            record += 1
+            yield f'record {record}', source
+
+    @staticmethod
+    def _timestamp(value):
+        for timestamp_format in IssueImport.TIMESTAMP_FORMATS:
+            try:
+                return datetime.strptime(value, timestamp_format).strftime('%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                pass
+        return None
+
+    @staticmethod
+    def validate(row, username):
+        """
+        Check one row against the issues table constraints. Returns
+        (issue dict, None) or (None, error message). Category, priority and
+        status are matched case-insensitively; status defaults to Not Started
+        and created_by to the importing user.
+        """
+        if not isinstance(row, dict):
+            return None, 'Not an object'
+
+        values = {}
+        for key, value in row.items():
+            key = IssueImport._normalize_key(key)
+            if key in IssueImport.FIELDS:
+                values[key] = '' if value is None else str(value).strip()
+
+        for field in IssueImport.REQUIRED:
+            if not values.get(field):
+                return None, f"'{field}' is required"
+
+        for field, allowed in (('category', Issue.CATEGORIES), ('priority', Issue.PRIORITIES),
+                               ('status', Issue.STATUSES)):
+            value = values.get(field) or ('Not Started' if field == 'status' else '')
+            match = next((choice for choice in allowed if choice.lower() == value.lower()), None)
+            if match is None:
+                return None, f"Invalid {field} '{value}' (expected one of: {', '.join(allowed)})"
+            values[field] = match
+
+        for field in ('created_at', 'updated_at'):
+            if values.get(field):
+                timestamp = IssueImport._timestamp(values[field])
+                if timestamp is None:
+                    return None, f"Invalid {field} '{values[field]}' (expected YYYY-MM-DD HH:MM:SS)"
+                values[field] = timestamp
+
+        issue = {field: values.get(field) or None for field in IssueImport.FIELDS}
+        issue['created_by'] = issue['created_by'] or username
+        issue['updated_at'] = issue['updated_at'] or issue['created_at']
+        return issue, None
+
+    @staticmethod
+    def _insert(chunk, username, report, db_path):
+        """Insert a chunk in one transaction; if it fails, insert its rows one by one to find the bad ones"""
+        try:
+            Issue.create_many([issue for _, issue in chunk], username, db_path=db_path)
+            report['imported'] += len(chunk)
+        except Exception:
+            for location, issue in chunk:
+                try:
+                    Issue.create_many([issue], username, db_path=db_path)
+                    report['imported'] += 1
+                except Exception as e:
+                    IssueImport._reject(report, location, str(e))
+
+    @staticmethod
+    def _reject(report, location, error):
+        report['rejected'] += 1
+        if len(report['errors']) < Config.IMPORT_MAX_ERRORS:
+            report['errors'].append((location, error))
+
+    @staticmethod
+    def run(path, import_format, username, chunk_size=None, progress=None, db_path=None):
+        """
+        Import the issues in the file at path. progress(done, total) is called
+        with the bytes read after each chunk. Returns a report with the counts
+        of imported and rejected rows and up to IMPORT_MAX_ERRORS
+        (location, error) pairs.
+        """
+        chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+        report = {'imported': 0, 'rejected': 0, 'errors': []}
+        total = os.path.getsize(path)
+        reader = IssueImport.read_csv if import_format == 'csv' else IssueImport.read_json
+
+        with open(path, 'rb') as f:
+            chunk = []
+            for location, row, error in reader(f):
+                if not error:
+                    issue, error = IssueImport.validate(row, username)
+                if error:
+                    IssueImport._reject(report, location, error)
+                    continue
+                chunk.append((location, issue))
+                if len(chunk) >= chunk_size:
+                    IssueImport._insert(chunk, username, report, db_path)
+                    chunk = []
+                    if progress:
+                        progress(f.tell(), total)
+            if chunk:
+                IssueImport._insert(chunk, username, report, db_path)
+        return report
+
+    @staticmethod
+    def write_errors(report, path):
+        """Write the rejected rows of a report as a CSV (Row, Error)"""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Row', 'Error'])
+            writer.writerows(report['errors'])
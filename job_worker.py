@@ -0,0 +1,18 @@
+"""
+Background job worker for IT Issue Tracker
+Runs queued backups, restores, resets and exports outside the web server.
+Use it with JOB_WORKER_THREADS=0 so web workers only queue jobs, or alongside
+the in-process worker threads to add capacity.
+Usage: python job_worker.py
+"""
+import app  # noqa: F401 - registers the job handlers
+from jobs import JobQueue
+
+
+if __name__ == '__main__':
+    print("Waiting for jobs (press CTRL+C to stop)...")
+    JobQueue.recover()
+    try:
+        JobQueue.work()
+    except KeyboardInterrupt:
+        print("\n✓ Job worker stopped")
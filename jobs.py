@@ -0,0 +1,345 @@
+"""
+Background jobs for IT Issue Tracker
+A small SQLite-backed queue for long-running admin operations (backups,
+restores, resets and large exports). Jobs are claimed atomically, so the
+worker threads of every gunicorn worker - or a separate `python job_worker.py`
+process - can share one queue. The queue lives in its own database file so
+restoring or resetting the main database never rewrites it.
+"""
+import json
+import os
+import shutil
+import threading
+import traceback
+from config import Config
+from models import close_db, get_db
+
+
+class JobQueue:
+    """SQLite-backed job queue with in-process worker threads"""
+
+    STATUSES = ('queued', 'running', 'done', 'failed')
+
+    # Job kind -> handler(job, progress), registered with @JobQueue.handler
+    handlers = {}
+
+    # Job kind -> seconds between automatic runs, registered with JobQueue.schedule
+    schedules = {}
+
+    # Job databases whose table has been created by this process
+    _ready = set()
+
+    # Set when a job is queued by this process so idle workers start at once
+    _wakeup = threading.Event()
+    _workers_lock = threading.Lock()
+    _workers_pid = None
+
+    @staticmethod
+    def handler(kind):
+        """
+        Register the function that runs jobs of this kind. It is called as
+        handler(job, progress) where progress(percent, message=None) reports
+        progress, and may return a dict with result_path, result_name and
+        message for the finished job.
+        """
+        def register(func):
+            JobQueue.handlers[kind] = func
+            return func
+        return register
+
+    @staticmethod
+    def schedule(kind, interval):
+        """Queue a job of this kind automatically every `interval` seconds (0 disables it)"""
+        if interval > 0:
+            JobQueue.schedules[kind] = interval
+        else:
+            JobQueue.schedules.pop(kind, None)
+
+    @staticmethod
+    def get_conn(db_path=None):
+        """Get the shared connection to the job database, creating its table if needed"""
+        db_path = db_path or Config.JOB_DATABASE_PATH
+        if db_path not in JobQueue._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = get_db(db_path)
+        if db_path not in JobQueue._ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued'
+                        CHECK(status IN ('queued', 'running', 'done', 'failed')),
+                    params TEXT,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result_path TEXT,
+                    result_name TEXT,
+                    error TEXT,
+                    created_by TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    heartbeat_at TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            ''')
+            # Job databases created before heartbeats were recorded
+            if 'heartbeat_at' not in [column[1] for column in conn.execute('PRAGMA table_info(jobs)')]:
+                conn.execute('ALTER TABLE jobs ADD COLUMN heartbeat_at TIMESTAMP')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)')
+            conn.commit()
+            JobQueue._ready.add(db_path)
+        return conn
+
+    @staticmethod
+    def enqueue(kind, params=None, created_by=None, db_path=None):
+        """Queue a job and return its id"""
+        if kind not in JobQueue.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+
+        conn = JobQueue.get_conn(db_path)
+        cursor = conn.cursor()
+        cursor.execute('INSERT INTO jobs (kind, params, created_by, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)',
+                       (kind, json.dumps(params or {}), created_by))
+        conn.commit()
+        JobQueue._wakeup.set()
+        return cursor.lastrowid
+
+    @staticmethod
+    def enqueue_due(db_path=None):
+        """
+        Queue every scheduled job kind that hasn't been queued within its
+        interval. Runs under the write lock, so workers polling at the same
+        time queue each job once. Returns the new job ids.
+        """
+        if not JobQueue.schedules:
+            return []
+
+        conn = JobQueue.get_conn(db_path)
+        cursor = conn.cursor()
+        job_ids = []
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for kind, interval in JobQueue.schedules.items():
+                cursor.execute("SELECT 1 FROM jobs WHERE kind = ? AND created_at > datetime('now', ?) LIMIT 1",
+                               (kind, f'-{int(interval)} seconds'))
+                if cursor.fetchone() is None:
+                    cursor.execute('''
+                        INSERT INTO jobs (kind, params, created_by, updated_at) VALUES (?, '{}', 'scheduler', CURRENT_TIMESTAMP)
+                    ''', (kind,))
+                    job_ids.append(cursor.lastrowid)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return job_ids
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job['params'] = json.loads(job['params'] or '{}')
+        return job
+
+    @staticmethod
+    def get(job_id, db_path=None):
+        """Get a job by ID"""
+        cursor = JobQueue.get_conn(db_path).cursor()
+        cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+        return JobQueue._to_dict(row) if row else None
+
+    @staticmethod
+    def get_recent(limit=50, db_path=None):
+        """Get the most recent jobs, newest first"""
+        cursor = JobQueue.get_conn(db_path).cursor()
+        cursor.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,))
+        return [JobQueue._to_dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def claim(db_path=None):
+        """Atomically take the oldest queued job and mark it running (None if the queue is empty)"""
+        conn = JobQueue.get_conn(db_path)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            cursor.execute('''
+                UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+                       heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (row['id'],))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        job = JobQueue._to_dict(row)
+        job['status'] = 'running'
+        return job
+
+    @staticmethod
+    def set_progress(job_id, progress, message=None, db_path=None):
+        """Record a running job's progress (0-100) and an optional status message"""
+        conn = JobQueue.get_conn(db_path)
+        conn.execute('''
+            UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (max(0, min(100, int(progress))), message, job_id))
+        conn.commit()
+
+    @staticmethod
+    def heartbeat(job_id, db_path=None):
+        """Record that the worker running a job is still alive"""
+        conn = JobQueue.get_conn(db_path)
+        conn.execute("UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'", (job_id,))
+        conn.commit()
+
+    @staticmethod
+    def _beat(job_id, done, db_path=None):
+        """Heartbeat thread for a running job: beat every JOB_HEARTBEAT_SECONDS until `done` is set"""
+        try:
+            while not done.wait(Config.JOB_HEARTBEAT_SECONDS):
+                try:
+                    JobQueue.heartbeat(job_id, db_path)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            close_db()
+
+    @staticmethod
+    def finish(job_id, result_path=None, result_name=None, message=None, db_path=None):
+        """Mark a job done, with its optional result file"""
+        conn = JobQueue.get_conn(db_path)
+        conn.execute('''
+            UPDATE jobs SET status = 'done', progress = 100, message = COALESCE(?, message),
+                   result_path = ?, result_name = ?, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (message, result_path, result_name, job_id))
+        conn.commit()
+
+    @staticmethod
+    def fail(job_id, error, db_path=None):
+        """Mark a job failed with an error message"""
+        conn = JobQueue.get_conn(db_path)
+        conn.execute('''
+            UPDATE jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (error, job_id))
+        conn.commit()
+
+    @staticmethod
+    def job_dir(job_id):
+        """Get (and create) the folder holding a job's input and result files"""
+        path = os.path.join(Config.JOB_FOLDER, str(job_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def run_next(db_path=None):
+        """Run the oldest queued job in this thread. Returns False if there was none."""
+        job = JobQueue.claim(db_path)
+        if job is None:
+            return False
+
+        last = {'percent': None}
+
+        def progress(percent, message=None):
+            # Only write when something visible changes, so handlers can report per item
+            percent = int(percent)
+            if percent != last['percent'] or message is not None:
+                last['percent'] = percent
+                JobQueue.set_progress(job['id'], percent, message, db_path)
+
+        # Beat from a separate thread so handlers that report no progress for a
+        # long time (a large backup or clean-up) aren't taken for dead
+        done = threading.Event()
+        beat = threading.Thread(target=JobQueue._beat, args=(job['id'], done, db_path),
+                                name=f"job-{job['id']}-heartbeat", daemon=True)
+        beat.start()
+
+        try:
+            handler = JobQueue.handlers.get(job['kind'])
+            if handler is None:
+                raise RuntimeError(f"No handler for '{job['kind']}' jobs in this process")
+            result = handler(job, progress) or {}
+            JobQueue.finish(job['id'], result.get('result_path'), result.get('result_name'),
+                            result.get('message'), db_path)
+        except Exception as e:
+            traceback.print_exc()
+            JobQueue.fail(job['id'], str(e) or e.__class__.__name__, db_path)
+        finally:
+            done.set()
+            beat.join()
+            # Drop connections opened by the handler; keep none between jobs
+            close_db()
+        return True
+
+    @staticmethod
+    def recover(db_path=None):
+        """
+        Fail jobs left 'running' by a process that died: no heartbeat for
+        JOB_STALE_SECONDS, however long the job has been running. Returns the
+        number of jobs failed.
+        """
+        conn = JobQueue.get_conn(db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET status = 'failed', error = 'Interrupted (worker stopped)', finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND IFNULL(heartbeat_at, updated_at) < datetime('now', ?)
+        ''', (f'-{int(Config.JOB_STALE_SECONDS)} seconds',))
+        conn.commit()
+        return cursor.rowcount
+
+    @staticmethod
+    def purge(days=None, db_path=None):
+        """Delete finished jobs older than JOB_RETENTION_DAYS and their files"""
+        days = Config.JOB_RETENTION_DAYS if days is None else days
+        conn = JobQueue.get_conn(db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < datetime('now', ?)
+        ''', (f'-{int(days)} days',))
+        job_ids = [row[0] for row in cursor.fetchall()]
+        for job_id in job_ids:
+            shutil.rmtree(os.path.join(Config.JOB_FOLDER, str(job_id)), ignore_errors=True)
+            cursor.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        conn.commit()
+        return len(job_ids)
+
+    @staticmethod
+    def work(db_path=None, stop=None):
+        """Worker loop: run queued jobs until `stop` (a threading.Event) is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                if JobQueue.run_next(db_path) or JobQueue.enqueue_due(db_path):
+                    continue
+            except Exception:
+                traceback.print_exc()
+            finally:
+                close_db()
+            JobQueue._wakeup.wait(Config.JOB_POLL_INTERVAL)
+            JobQueue._wakeup.clear()
+
+    @staticmethod
+    def start_workers(count=None, db_path=None):
+        """
+        Start this process's worker threads once (again after a fork, since
+        threads started in a --preload master don't survive into workers)
+        """
+        count = Config.JOB_WORKER_THREADS if count is None else count
+        if count <= 0 or JobQueue._workers_pid == os.getpid():
+            return
+        with JobQueue._workers_lock:
+            if JobQueue._workers_pid == os.getpid():
+                return
+            JobQueue._workers_pid = os.getpid()
+            JobQueue.recover(db_path)
+            JobQueue.purge(db_path=db_path)
+            for index in range(count):
+                thread = threading.Thread(target=JobQueue.work, args=(db_path,),
+                                          name=f'job-worker-{index + 1}', daemon=True)
+                thread.start()
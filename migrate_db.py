@@ -3,6 +3,7 @@ Database migration script to add company, department, and application fields
 Run this to update your existing database without losing data
 """
 import sqlite3
+from models import Database
 
 def migrate_database():
     """Add new columns to existing database"""
@@ -63,6 +64,13 @@ def migrate_database():
             print("✓ 'application' column already exists in issues")
 
         conn.commit()
+
+        # Apply pending versioned migrations (indexes etc.)
+        print("\n--- Applying versioned schema migrations ---")
+        applied = Database('issue_tracker.db').migrate(conn)
+        if not applied:
+            print("✓ Schema is already up to date")
+
         print("\n" + "="*60)
         print("Migration completed successfully!")
         print("="*60)
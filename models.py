@@ -1,40 +1,325 @@
 """
 Database models for IT Issue Tracker
 """
+import base64
+import glob
+import hashlib
+import json
+import os
+import re
 import sqlite3
+import threading
 from datetime import datetime
+from pathlib import Path
+from flask import g, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
+from cache import reference_cache, result_cache, user_cache
+from config import Config
 
 
-def get_db_connection(db_path='issue_tracker.db'):
+# Default database path (honours DATABASE_PATH from the environment / .env)
+DEFAULT_DB_PATH = Config.DATABASE_PATH
+
+# Connections used outside of a Flask app context (CLI scripts, threads)
+_thread_local = threading.local()
+
+
+def get_db_connection(db_path=None):
     """
     Get database connection with proper settings for concurrency.
     This helper ensures all connections use WAL mode and proper timeouts.
     """
-    conn = sqlite3.connect(db_path, timeout=10.0)
+    # uri=True lets archived audit logs be attached read-only ('file:...?mode=ro');
+    # plain paths are opened as before
+    conn = sqlite3.connect(db_path or DEFAULT_DB_PATH, timeout=10.0, uri=True)
     conn.row_factory = sqlite3.Row
     # Enable WAL mode for better concurrent access
     conn.execute('PRAGMA journal_mode=WAL')
     # Set busy timeout to 5 seconds
     conn.execute('PRAGMA busy_timeout=5000')
+    # Enforce foreign keys so deleting an issue cascades to its documents
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+
+def _connection_registry():
+    """Return the dict of open connections for the current request or thread"""
+    if has_app_context():
+        if '_db_connections' not in g:
+            g._db_connections = {}
+        return g._db_connections
+
+    if not hasattr(_thread_local, 'connections'):
+        _thread_local.connections = {}
+    return _thread_local.connections
+
+
+def get_db(db_path=None):
+    """
+    Get the shared database connection for the current request.
+    Inside Flask the connection lives on `g` and is closed at teardown;
+    outside Flask (CLI scripts) one connection is kept per thread.
+    """
+    db_path = db_path or DEFAULT_DB_PATH
+    connections = _connection_registry()
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = get_db_connection(db_path)
+        connections[db_path] = conn
     return conn
 
 
+def close_db(exception=None):
+    """Close every shared connection opened by the current request or thread"""
+    connections = _connection_registry()
+    while connections:
+        _, conn = connections.popitem()
+        conn.close()
+
+
+def _create_issues_fts(cursor):
+    """
+    Create the issues_fts full-text index (external content on issues) and the
+    triggers that keep it in sync. Skipped if SQLite was built without FTS5;
+    searches then fall back to LIKE matching.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+                title, description, company, department, application,
+                content='issues', content_rowid='id', prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"Note: Full-text search unavailable, using LIKE search instead ({e})")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS issues_fts_insert AFTER INSERT ON issues BEGIN
+            INSERT INTO issues_fts (rowid, title, description, company, department, application)
+            VALUES (new.id, new.title, new.description, new.company, new.department, new.application);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS issues_fts_delete AFTER DELETE ON issues BEGIN
+            INSERT INTO issues_fts (issues_fts, rowid, title, description, company, department, application)
+            VALUES ('delete', old.id, old.title, old.description, old.company, old.department, old.application);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS issues_fts_update
+        AFTER UPDATE OF title, description, company, department, application ON issues BEGIN
+            INSERT INTO issues_fts (issues_fts, rowid, title, description, company, department, application)
+            VALUES ('delete', old.id, old.title, old.description, old.company, old.department, old.application);
+            INSERT INTO issues_fts (rowid, title, description, company, department, application)
+            VALUES (new.id, new.title, new.description, new.company, new.department, new.application);
+        END
+    ''')
+
+    # Index the issues that already exist
+    cursor.execute("INSERT INTO issues_fts (issues_fts) VALUES ('rebuild')")
+
+
+def _create_issue_counters(cursor):
+    """
+    Create the issue_counters aggregate table and the triggers that keep it
+    in step with issues. NULL company/department are stored as '' so every
+    combination maps to exactly one row.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS issue_counters (
+            company TEXT NOT NULL DEFAULT '',
+            department TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            category TEXT NOT NULL,
+            issue_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (company, department, status, priority, category)
+        ) WITHOUT ROWID
+    ''')
+
+    increment = '''
+        INSERT INTO issue_counters (company, department, status, priority, category, issue_count)
+        VALUES (IFNULL(new.company, ''), IFNULL(new.department, ''), new.status, new.priority, new.category, 1)
+        ON CONFLICT (company, department, status, priority, category)
+        DO UPDATE SET issue_count = issue_count + 1;
+    '''
+    decrement = '''
+        UPDATE issue_counters SET issue_count = issue_count - 1
+        WHERE company = IFNULL(old.company, '') AND department = IFNULL(old.department, '')
+          AND status = old.status AND priority = old.priority AND category = old.category;
+        DELETE FROM issue_counters
+        WHERE company = IFNULL(old.company, '') AND department = IFNULL(old.department, '')
+          AND status = old.status AND priority = old.priority AND category = old.category
+          AND issue_count <= 0;
+    '''
+
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS issue_counters_insert AFTER INSERT ON issues BEGIN {increment} END')
+    cursor.execute(f'CREATE TRIGGER IF NOT EXISTS issue_counters_delete AFTER DELETE ON issues BEGIN {decrement} END')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS issue_counters_update
+        AFTER UPDATE OF company, department, status, priority, category ON issues BEGIN
+            {decrement}
+            {increment}
+        END
+    ''')
+
+    IssueCounters.rebuild(cursor=cursor)
+
+
+def _create_reference_versions(cursor):
+    """
+    Create the data_versions table and the triggers that give the reference
+    data a new random version whenever a company, department or application
+    changes, so every worker can tell when its cached copy is stale.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('reference', random())")
+
+    for table in ReferenceData.TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE data_versions SET version = random() WHERE name = 'reference';
+                END
+            ''')
+
+
+def _add_document_hashes(cursor):
+    """Add the SHA-256 of each upload to the documents table (NULL for older uploads)"""
+    cursor.execute('PRAGMA table_info(documents)')
+    if 'sha256' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE documents ADD COLUMN sha256 TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256)')
+
+
+def _create_document_blobs(cursor):
+    """
+    Create the document_blobs table: one row per stored file content with the
+    number of documents using it, kept current by triggers on documents (so
+    rows removed by ON DELETE CASCADE are counted too).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_blobs (
+            sha256 TEXT PRIMARY KEY,
+            file_size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    increment = '''
+        INSERT INTO document_blobs (sha256, file_size, ref_count) VALUES (new.sha256, new.file_size, 1)
+        ON CONFLICT (sha256) DO UPDATE SET ref_count = ref_count + 1;
+    '''
+    decrement = '''
+        UPDATE document_blobs SET ref_count = ref_count - 1 WHERE sha256 = old.sha256;
+    '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS document_blobs_insert AFTER INSERT ON documents
+        WHEN new.sha256 IS NOT NULL BEGIN {increment} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS document_blobs_delete AFTER DELETE ON documents
+        WHEN old.sha256 IS NOT NULL BEGIN {decrement} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS document_blobs_update_old AFTER UPDATE OF sha256 ON documents
+        WHEN old.sha256 IS NOT NULL AND old.sha256 IS NOT new.sha256 BEGIN {decrement} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS document_blobs_update_new AFTER UPDATE OF sha256 ON documents
+        WHEN new.sha256 IS NOT NULL AND old.sha256 IS NOT new.sha256 BEGIN {increment} END
+    ''')
+
+    cursor.execute('DELETE FROM document_blobs')
+    cursor.execute('''
+        INSERT INTO document_blobs (sha256, file_size, ref_count)
+        SELECT sha256, MAX(file_size), COUNT(*) FROM documents WHERE sha256 IS NOT NULL GROUP BY sha256
+    ''')
+
+
+# Ordered schema migrations as (version, description, steps). A step is either
+# an SQL statement or a callable taking a cursor. Each migration is applied
+# exactly once and recorded in the schema_version table; append new entries
+# with the next version number and never edit or reorder applied ones.
+MIGRATIONS = [
+    (1, 'Index issues by scope, status and creation date', [
+        'CREATE INDEX IF NOT EXISTS idx_issues_scope_status_created '
+        'ON issues (company, department, status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_issues_status_created ON issues (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_issues_created ON issues (created_at)',
+    ]),
+    (2, 'Index audit log by issue and timestamp', [
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_issue_timestamp ON audit_log (issue_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_timestamp ON audit_log (timestamp)',
+    ]),
+    (3, 'Index documents by issue', [
+        'CREATE INDEX IF NOT EXISTS idx_documents_issue_uploaded ON documents (issue_id, uploaded_at)',
+    ]),
+    (4, 'Full-text search index for issues', [
+        _create_issues_fts,
+    ]),
+    (5, 'Trigger-maintained issue counters for dashboard KPIs', [
+        _create_issue_counters,
+    ]),
+    (6, 'Index audit log by user, action and field', [
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_username_timestamp ON audit_log (username, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_action_timestamp ON audit_log (action, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_audit_log_field_timestamp ON audit_log (field_name, timestamp)',
+    ]),
+    (7, 'Version row for cached companies, departments and applications', [
+        _create_reference_versions,
+    ]),
+    (8, 'SHA-256 of uploaded documents', [
+        _add_document_hashes,
+    ]),
+    (9, 'Reference-counted document storage', [
+        _create_document_blobs,
+    ]),
+    (10, 'Index documents by stored file', [
+        'CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents (filename)',
+    ]),
+    (11, 'Generation row changed by restores and resets', [
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('generation', random())",
+    ]),
+]
+
+
 class Database:
     """Database connection handler"""
 
-    def __init__(self, db_path='issue_tracker.db'):
-        self.db_path = db_path
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
 
     def get_connection(self):
-        """Get database connection with optimizations for concurrency"""
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrent access
-        conn.execute('PRAGMA journal_mode=WAL')
-        # Set busy timeout
-        conn.execute('PRAGMA busy_timeout=5000')
-        return conn
+        """Get a dedicated database connection with optimizations for concurrency"""
+        return get_db_connection(self.db_path)
+
+    def ensure_schema(self):
+        """
+        Fast startup check: read the stored schema version and only run the
+        full init_db() (table creation, legacy column checks and pending
+        migrations) when the database is behind MIGRATIONS. Returns True if
+        init_db() ran.
+        """
+        if self.is_current():
+            return False
+        self.init_db()
+        return True
+
+    def is_current(self):
+        """Check whether every migration in MIGRATIONS has been applied"""
+        conn = self.get_connection()
+        try:
+            return self.get_schema_version(conn) >= MIGRATIONS[-1][0]
+        finally:
+            conn.close()
 
     def init_db(self):
         """Initialize database with tables"""
@@ -97,6 +382,7 @@ class Database:
                 file_size INTEGER NOT NULL,
                 uploaded_by TEXT NOT NULL,
                 uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sha256 TEXT,
                 FOREIGN KEY (issue_id) REFERENCES issues (id) ON DELETE CASCADE
             )
         ''')
@@ -174,17 +460,87 @@ class Database:
             conn.commit()
         except Exception as e:
             print(f"Note: Auto-migration check completed with message: {e}")
+
+        try:
+            self.migrate(conn)
         finally:
             conn.close()
 
+    @staticmethod
+    def get_schema_version(conn):
+        """Get the highest applied migration version (0 if none)"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='schema_version'")
+        if not cursor.fetchone():
+            return 0
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+        return cursor.fetchone()[0] or 0
+
+    def migrate(self, conn=None):
+        """
+        Apply pending versioned migrations from MIGRATIONS in order.
+        Each migration runs in its own write-locked transaction so concurrent
+        workers never apply the same step twice. Returns the applied versions.
+        """
+        should_close = False
+        if conn is None:
+            conn = self.get_connection()
+            should_close = True
+
+        cursor = conn.cursor()
+        applied = []
+
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+
+            for version, description, steps in MIGRATIONS:
+                if version <= self.get_schema_version(conn):
+                    continue
+
+                # Take the write lock, then re-check in case another worker won the race
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    cursor.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,))
+                    if cursor.fetchone():
+                        conn.rollback()
+                        continue
+
+                    for step in steps:
+                        if callable(step):
+                            step(cursor)
+                        else:
+                            cursor.execute(step)
+
+                    cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                                   (version, description))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+
+                applied.append(version)
+                print(f"✓ Applied migration {version}: {description}")
+        finally:
+            if should_close:
+                conn.close()
+
+        return applied
+
 
 class User:
     """User model"""
 
     @staticmethod
-    def create(username, password, role='viewer', company=None, department=None, db_path='issue_tracker.db'):
+    def create(username, password, role='viewer', company=None, department=None, db_path=None):
         """Create a new user"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
         password_hash = generate_password_hash(password)
 
@@ -194,58 +550,70 @@ class User:
                 (username, password_hash, role, company, department)
             )
             conn.commit()
-            user_id = cursor.lastrowid
-            conn.close()
-            return user_id
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return None
 
     @staticmethod
-    def get_by_username(username, db_path='issue_tracker.db'):
+    def get_by_username(username, db_path=None):
         """Get user by username"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
         user = cursor.fetchone()
-        conn.close()
         return dict(user) if user else None
 
     @staticmethod
-    def get_by_id(user_id, db_path='issue_tracker.db'):
+    def get_by_id(user_id, db_path=None):
         """Get user by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
         user = cursor.fetchone()
-        conn.close()
         return dict(user) if user else None
 
+    @staticmethod
+    def get_session_user(user_id, db_path=None):
+        """
+        Get the fields needed for a logged-in user (no password hash), served
+        from the per-worker user cache on repeat requests
+        """
+        key = (db_path or DEFAULT_DB_PATH, int(user_id))
+        user = user_cache.get(key)
+        if user is None:
+            conn = get_db(db_path)
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT id, username, role, company, department FROM users WHERE id = ?', (user_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            user = dict(row)
+            user_cache.set(key, user)
+        return dict(user)
+
     @staticmethod
     def verify_password(password_hash, password):
         """Verify password against hash"""
         return check_password_hash(password_hash, password)
 
     @staticmethod
-    def get_all(db_path='issue_tracker.db'):
+    def get_all(db_path=None):
         """Get all users"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT id, username, role, company, department, created_at FROM users ORDER BY username')
         users = cursor.fetchall()
-        conn.close()
         return [dict(user) for user in users]
 
     @staticmethod
-    def update(user_id, username=None, password=None, role=None, company=None, department=None, db_path='issue_tracker.db'):
+    def update(user_id, username=None, password=None, role=None, company=None, department=None, db_path=None):
         """Update user information"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         update_fields = []
@@ -272,7 +640,6 @@ class User:
             values.append(department)
 
         if not update_fields:
-            conn.close()
             return False
 
         values.append(user_id)
@@ -281,59 +648,141 @@ class User:
         try:
             cursor.execute(query, values)
             conn.commit()
-            conn.close()
+            user_cache.invalidate((db_path or DEFAULT_DB_PATH, int(user_id)))
             return True
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return False
 
     @staticmethod
-    def delete(user_id, db_path='issue_tracker.db'):
+    def delete(user_id, db_path=None):
         """Delete a user"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
         conn.commit()
-        conn.close()
+        user_cache.invalidate((db_path or DEFAULT_DB_PATH, int(user_id)))
 
 
 class Issue:
     """Issue model"""
 
+    # Allowed values (mirrors the CHECK constraints on the issues table)
+    CATEGORIES = ('Hardware', 'Software', 'Network', 'Security', 'Other')
+    PRIORITIES = ('Low', 'Medium', 'High', 'Critical')
+    STATUSES = ('Open', 'Not Started', 'In Progress', 'Resolved', 'Closed')
+
+    # Columns that can be used in Issue.query() filters and sorting
+    EXACT_FILTERS = ('status', 'priority', 'category')
+    NOCASE_FILTERS = ('company', 'department', 'application')
+    SEARCH_FIELDS = ('title', 'description', 'company', 'department', 'application')
+
+    # Sortable columns mapped to their (never NULL) sort key expressions,
+    # so keyset pagination can compare on them directly
+    SORT_KEYS = {
+        'id': 'issues.id',
+        'title': 'issues.title',
+        'description': 'issues.description',
+        'company': "IFNULL(issues.company, '')",
+        'department': "IFNULL(issues.department, '')",
+        'application': "IFNULL(issues.application, '')",
+        'category': 'issues.category',
+        'priority': "CASE issues.priority WHEN 'Low' THEN 0 WHEN 'Medium' THEN 1 WHEN 'High' THEN 2 ELSE 3 END",
+        'status': "CASE issues.status WHEN 'Open' THEN 0 WHEN 'Not Started' THEN 0 WHEN 'In Progress' THEN 1 "
+                  "WHEN 'Resolved' THEN 2 ELSE 3 END",
+        'assigned_to': "IFNULL(issues.assigned_to, '')",
+        'created_by': 'issues.created_by',
+        'created_at': 'issues.created_at',
+        'updated_at': 'issues.updated_at',
+    }
+    DEFAULT_SORT = ('-created_at',)
+
+    # Pseudo sort key ordering full-text search results by BM25 rank
+    RELEVANCE = 'relevance'
+
+    # Markers wrapped around search matches in highlighted titles/snippets;
+    # control characters so they can't collide with (or inject) user content
+    HIGHLIGHT_START = '\x02'
+    HIGHLIGHT_END = '\x03'
+
     @staticmethod
-    def create(title, description, company, department, application, category, priority, status, assigned_to, created_by, db_path='issue_tracker.db'):
+    def create(title, description, company, department, application, category, priority, status, assigned_to, created_by, db_path=None):
         """Create a new issue and log the creation"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO issues (title, description, company, department, application, category, priority, status, assigned_to, created_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, description, company, department, application, category, priority, status, assigned_to, created_by))
-
-        issue_id = cursor.lastrowid
-
-        # Log the creation in audit log
-        AuditLog.log_action(
-            username=created_by,
-            issue_id=issue_id,
-            action='Created',
-            field_name='Issue',
-            old_value=None,
-            new_value=f'{title}',
-            conn=conn
-        )
+        try:
+            cursor.execute('''
+                INSERT INTO issues (title, description, company, department, application, category, priority, status, assigned_to, created_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, description, company, department, application, category, priority, status, assigned_to, created_by))
+
+            issue_id = cursor.lastrowid
+
+            # Log the creation in audit log
+            AuditLog.log_action(
+                username=created_by,
+                issue_id=issue_id,
+                action='Created',
+                field_name='Issue',
+                old_value=None,
+                new_value=f'{title}',
+                conn=conn
+            )
 
-        conn.commit()
-        conn.close()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        result_cache.invalidate_scope(company, department)
         return issue_id
 
     @staticmethod
-    def get_all(company=None, department=None, db_path='issue_tracker.db'):
+    def create_many(issues, username, db_path=None):
+        """
+        Create a batch of issues in one transaction with one executemany, and
+        log a 'Created' audit entry for each with a single INSERT ... SELECT.
+        Each issue is a dict with the create() fields and optional created_at
+        and updated_at. Returns the number of issues created.
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        # The write lock keeps other writers out, so every new id is above the current maximum
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('SELECT IFNULL(MAX(id), 0) FROM issues')
+            last_id = cursor.fetchone()[0]
+
+            cursor.executemany('''
+                INSERT INTO issues (title, description, company, department, application, category, priority,
+                                    status, assigned_to, created_by, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+            ''', [(issue['title'], issue['description'], issue.get('company'), issue.get('department'),
+                   issue.get('application'), issue['category'], issue['priority'], issue['status'],
+                   issue.get('assigned_to'), issue['created_by'], issue.get('created_at'), issue.get('updated_at'))
+                  for issue in issues])
+
+            cursor.execute('''
+                INSERT INTO audit_log (username, issue_id, action, field_name, old_value, new_value)
+                SELECT ?, id, 'Created', 'Issue', NULL, title FROM issues WHERE id > ? ORDER BY id
+            ''', (username, last_id))
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for company, department in {(issue.get('company'), issue.get('department')) for issue in issues}:
+            result_cache.invalidate_scope(company, department)
+        return len(issues)
+
+    @staticmethod
+    def get_all(company=None, department=None, db_path=None):
         """Get all issues, optionally filtered by company and/or department"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         query = 'SELECT * FROM issues'
@@ -355,101 +804,588 @@ class Issue:
 
         cursor.execute(query, params)
         issues = cursor.fetchall()
-        conn.close()
         return [dict(issue) for issue in issues]
 
     @staticmethod
-    def get_by_id(issue_id, db_path='issue_tracker.db'):
+    def has_fts(conn):
+        """Check whether the issues_fts full-text index exists in this database"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='issues_fts'")
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def fts_query(search):
+        """
+        Convert free-text search into an FTS5 query: every word must match,
+        as a prefix of an indexed token. Returns None if there are no words.
+        """
+        words = re.findall(r'\w+', search or '')
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def search_plan(search, conn):
+        """Return the FTS5 query to use for `search`, or None to fall back to LIKE"""
+        if not search or not Issue.has_fts(conn):
+            return None
+        return Issue.fts_query(search)
+
+    @staticmethod
+    def build_from(fts=None):
+        """Build the FROM clause, joining the full-text index when searching with FTS"""
+        if fts:
+            return ' FROM issues JOIN issues_fts ON issues_fts.rowid = issues.id'
+        return ' FROM issues'
+
+    @staticmethod
+    def build_select(fts=None):
+        """Build the select list; FTS searches add highlighted title and snippet columns"""
+        if fts:
+            return (f"SELECT issues.*, "
+                    f"highlight(issues_fts, 0, '{Issue.HIGHLIGHT_START}', '{Issue.HIGHLIGHT_END}') AS title_highlight, "
+                    f"snippet(issues_fts, 1, '{Issue.HIGHLIGHT_START}', '{Issue.HIGHLIGHT_END}', '…', 16) AS search_snippet")
+        return 'SELECT issues.*'
+
+    @staticmethod
+    def build_where(filters=None, search=None, company=None, department=None, fts=None):
+        """
+        Build a parameterized WHERE clause for issue queries.
+        company/department restrict the result to a user's scope and are always
+        matched exactly; filters holds the user-selected tracker filters.
+        When `fts` (an FTS5 query) is given the search uses the full-text index,
+        otherwise it falls back to LIKE substring matching.
+        Returns (sql, params) where sql is '' when nothing is filtered.
+        """
+        conditions = []
+        params = []
+
+        if company:
+            conditions.append('issues.company = ?')
+            params.append(company)
+
+        if department:
+            conditions.append('issues.department = ?')
+            params.append(department)
+
+        for field, value in (filters or {}).items():
+            if value in (None, '') or field not in Issue.EXACT_FILTERS + Issue.NOCASE_FILTERS:
+                continue
+            collate = ' COLLATE NOCASE' if field in Issue.NOCASE_FILTERS else ''
+            if isinstance(value, (list, tuple, set)):
+                conditions.append(f'issues.{field}{collate} IN ({", ".join("?" * len(value))})')
+                params.extend(value)
+            else:
+                conditions.append(f'issues.{field} = ?{collate}')
+                params.append(value)
+
+        if fts:
+            conditions.append('issues_fts MATCH ?')
+            params.append(fts)
+        elif search:
+            # Escape LIKE wildcards so the search term is matched literally
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append('(' + ' OR '.join(f"issues.{field} LIKE ? ESCAPE '\\'" for field in Issue.SEARCH_FIELDS) + ')')
+            params.extend([pattern] * len(Issue.SEARCH_FIELDS))
+
+        if not conditions:
+            return '', params
+        return ' WHERE ' + ' AND '.join(conditions), params
+
+    @staticmethod
+    def sort_terms(sort=None, fts=None):
+        """
+        Resolve sort keys (column names, '-' prefix for descending) into a list
+        of (column, expression, descending) terms. Unknown columns are ignored
+        and id is always appended as a unique tie-breaker. The relevance key is
+        only honoured for full-text searches.
+        """
+        terms = []
+        seen = set()
+        for key in sort or Issue.DEFAULT_SORT:
+            descending = key.startswith('-')
+            field = key.lstrip('-')
+            if field in seen:
+                continue
+            if field == Issue.RELEVANCE and fts:
+                # FTS5 rank is bm25(), where lower values are better matches
+                expr = 'issues_fts.rank'
+            elif field in Issue.SORT_KEYS:
+                expr = Issue.SORT_KEYS[field]
+            else:
+                continue
+            seen.add(field)
+            terms.append((field, expr, descending))
+
+        if not terms:
+            terms.append(('created_at', Issue.SORT_KEYS['created_at'], True))
+        if 'id' not in seen:
+            terms.append(('id', Issue.SORT_KEYS['id'], terms[-1][2]))
+        return terms
+
+    @staticmethod
+    def build_order_by(sort=None, reverse=False, fts=None):
+        """Build an ORDER BY clause for the given sort keys"""
+        return ' ORDER BY ' + ', '.join(
+            f'{expr} {"DESC" if descending != reverse else "ASC"}'
+            for _, expr, descending in Issue.sort_terms(sort, fts)
+        )
+
+    @staticmethod
+    def build_keyset(terms, values, reverse=False):
+        """
+        Build the keyset condition selecting rows strictly after `values`
+        (or before them when reverse is set) in the order given by `terms`.
+        Both forms let SQLite seek an index to the cursor instead of scanning
+        from the first row. When every term sorts the same way this is a row
+        value comparison. Otherwise it is the expanded OR of each term,
+        ANDed with an inclusive bound on the first term.
+        Returns (sql, params).
+        """
+        expressions = [expr for _, expr, _ in terms]
+        descending = [desc != reverse for _, _, desc in terms]
+        if len(set(descending)) == 1:
+            operator = '<' if descending[0] else '>'
+            placeholders = ', '.join('?' * len(terms))
+            return f'({", ".join(expressions)}) {operator} ({placeholders})', list(values)
+
+        clauses = []
+        params = [values[0]]
+        for i, expr in enumerate(expressions):
+            parts = [f'{prev_expr} = ?' for prev_expr in expressions[:i]]
+            params.extend(values[:i])
+            parts.append(f'{expr} {"<" if descending[i] else ">"} ?')
+            params.append(values[i])
+            clauses.append('(' + ' AND '.join(parts) + ')')
+        bound = f'{expressions[0]} {"<=" if descending[0] else ">="} ?'
+        return f'({bound} AND (' + ' OR '.join(clauses) + '))', params
+
+    @staticmethod
+    def encode_cursor(values):
+        """Encode sort key values into an opaque, URL-safe pagination cursor"""
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, length):
+        """Decode a pagination cursor, returning None if it is malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != length:
+            return None
+        return values
+
+    @staticmethod
+    def cursor_position(cursor, terms, fts, conn):
+        """
+        Resolve an issue page cursor (the id of the row it points at) into that
+        row's current sort key values, or None if the cursor is malformed or
+        the row is gone. Keeping only the id in the cursor keeps page URLs
+        short whatever the sort columns hold.
+        """
+        anchor = Issue.decode_cursor(cursor, 1)
+        if anchor is None or not isinstance(anchor[0], int):
+            return None
+
+        keys = ', '.join(expr for _, expr, _ in terms)
+        if any(field == Issue.RELEVANCE for field, _, _ in terms):
+            # The rank only exists for rows matching the full-text query
+            query = f'SELECT {keys}' + Issue.build_from(fts) + ' WHERE issues_fts MATCH ? AND issues.id = ?'
+            params = (fts, anchor[0])
+        else:
+            query = f'SELECT {keys} FROM issues WHERE issues.id = ?'
+            params = (anchor[0],)
+        row = conn.execute(query, params).fetchone()
+        return list(row) if row else None
+
+    @staticmethod
+    def query(filters=None, search=None, sort=None, limit=None, company=None, department=None, db_path=None):
+        """
+        Get issues matching the given filters, search text and sort order.
+        Filtering, searching and sorting all happen in one SQL statement, built
+        by the same helpers as paginate() and iter_query().
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        fts = Issue.search_plan(search, conn)
+        where, params = Issue.build_where(filters, search, company, department, fts)
+        query = Issue.build_select(fts) + Issue.build_from(fts) + where + Issue.build_order_by(sort, fts=fts)
+
+        if limit:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+
+        cursor.execute(query, params)
+        issues = cursor.fetchall()
+        return [dict(issue) for issue in issues]
+
+    @staticmethod
+    def iter_query(filters=None, search=None, sort=None, company=None, department=None,
+                   batch_size=500, db_path=None):
+        """
+        Iterate over matching issues in batches of `batch_size` rows.
+        Uses its own connection (closed when iteration ends) so it can be
+        consumed after the request that created it has finished, e.g. while
+        streaming a response.
+        """
+        conn = get_db_connection(db_path)
+        try:
+            cursor = conn.cursor()
+            fts = Issue.search_plan(search, conn)
+            where, params = Issue.build_where(filters, search, company, department, fts)
+            cursor.execute(Issue.build_select(fts) + Issue.build_from(fts) + where +
+                           Issue.build_order_by(sort, fts=fts), params)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def paginate(filters=None, search=None, sort=None, page_size=50, after=None, before=None,
+                 company=None, department=None, db_path=None):
+        """
+        Get one page of issues using keyset pagination on (sort keys, id).
+        `after`/`before` are cursors from a previous page, holding the id of
+        its last/first issue; every page costs the same regardless of how
+        deep it is. Returns a dict with the issues and
+        the cursors for the neighbouring pages (None when there is no such page).
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        fts = Issue.search_plan(search, conn)
+        terms = Issue.sort_terms(sort, fts)
+        where, params = Issue.build_where(filters, search, company, department, fts)
+
+        reverse = False
+        position = None
+        if after:
+            position = Issue.cursor_position(after, terms, fts, conn)
+        elif before:
+            position = Issue.cursor_position(before, terms, fts, conn)
+            reverse = position is not None
+
+        if position is not None:
+            keyset, keyset_params = Issue.build_keyset(terms, position, reverse)
+            where += (' AND ' if where else ' WHERE ') + keyset
+            params.extend(keyset_params)
+
+        query = Issue.build_select(fts) + Issue.build_from(fts) + where + Issue.build_order_by(sort, reverse, fts) + ' LIMIT ?'
+        params.append(page_size + 1)
+
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        issues = [dict(row) for row in rows]
+
+        # Going forward there is a previous page whenever we started from a cursor;
+        # going backward there is always a next page (the one we came from)
+        has_next = has_more if not reverse else True
+        has_prev = position is not None if not reverse else has_more
+
+        return {
+            'issues': issues,
+            'next_cursor': Issue.encode_cursor([issues[-1]['id']]) if issues and has_next else None,
+            'prev_cursor': Issue.encode_cursor([issues[0]['id']]) if issues and has_prev else None,
+        }
+
+    @staticmethod
+    def count(filters=None, search=None, company=None, department=None, db_path=None):
+        """
+        Count issues matching the given filters and search text. Without a
+        search or application filter the count is summed from issue_counters
+        (a few rows per scope) instead of counting every matching issue.
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        if not search and not (filters or {}).get('application') and IssueCounters.exists(conn):
+            # The counters have the same company/department/status/priority/category
+            # columns, so the issue WHERE clause applies to them under the same alias
+            where, params = Issue.build_where(filters, None, company, department)
+            cursor.execute('SELECT IFNULL(SUM(issues.issue_count), 0) FROM issue_counters AS issues' + where, params)
+            return cursor.fetchone()[0]
+
+        fts = Issue.search_plan(search, conn)
+        where, params = Issue.build_where(filters, search, company, department, fts)
+        cursor.execute('SELECT COUNT(*)' + Issue.build_from(fts) + where, params)
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def get_by_id(issue_id, db_path=None):
         """Get issue by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM issues WHERE id = ?', (issue_id,))
         issue = cursor.fetchone()
-        conn.close()
         return dict(issue) if issue else None
 
     @staticmethod
-    def update(issue_id, username, updates, db_path='issue_tracker.db'):
+    def update(issue_id, username, updates, db_path=None):
         """Update an issue and log all changes"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
-        # Get current issue data
-        cursor.execute('SELECT * FROM issues WHERE id = ?', (issue_id,))
-        old_issue = dict(cursor.fetchone())
+        try:
+            # Get current issue data
+            cursor.execute('SELECT * FROM issues WHERE id = ?', (issue_id,))
+            old_issue = dict(cursor.fetchone())
+
+            # Collect changed fields and their audit entries
+            update_fields = []
+            values = []
+            audit_entries = []
+            for field, new_value in updates.items():
+                if field in old_issue and old_issue[field] != new_value:
+                    update_fields.append(f'{field} = ?')
+                    values.append(new_value)
+                    audit_entries.append({
+                        'username': username,
+                        'issue_id': issue_id,
+                        'action': 'Updated',
+                        'field_name': field,
+                        'old_value': str(old_issue[field]) if old_issue[field] is not None else None,
+                        'new_value': str(new_value) if new_value is not None else None
+                    })
+
+            if update_fields:
+                # Add updated_at timestamp
+                update_fields.append('updated_at = CURRENT_TIMESTAMP')
+                values.append(issue_id)
+
+                query = f'UPDATE issues SET {", ".join(update_fields)} WHERE id = ?'
+                cursor.execute(query, values)
+
+                # Log all field changes with one batched insert
+                AuditLog.log_many(audit_entries, conn=conn)
 
-        # Update the issue
-        update_fields = []
-        values = []
-        for field, new_value in updates.items():
-            if field in old_issue and old_issue[field] != new_value:
-                update_fields.append(f'{field} = ?')
-                values.append(new_value)
-
-                # Log each field change
-                AuditLog.log_action(
-                    username=username,
-                    issue_id=issue_id,
-                    action='Updated',
-                    field_name=field,
-                    old_value=str(old_issue[field]) if old_issue[field] is not None else None,
-                    new_value=str(new_value) if new_value is not None else None,
-                    conn=conn
-                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
         if update_fields:
-            # Add updated_at timestamp
-            update_fields.append('updated_at = CURRENT_TIMESTAMP')
-            values.append(issue_id)
+            # The issue may have moved between scopes, so both are stale
+            result_cache.invalidate_scope(old_issue['company'], old_issue['department'])
+            result_cache.invalidate_scope(updates.get('company', old_issue['company']),
+                                          updates.get('department', old_issue['department']))
 
-            query = f'UPDATE issues SET {", ".join(update_fields)} WHERE id = ?'
-            cursor.execute(query, values)
+    # Fields that can be changed on many issues at once
+    BULK_FIELDS = ('status', 'priority', 'category', 'assigned_to')
 
-        conn.commit()
-        conn.close()
+    @staticmethod
+    def bulk_update(issue_ids, username, updates, company=None, department=None, scoped=False, db_path=None):
+        """
+        Apply one set of field changes to many issues in one transaction: an
+        audit INSERT ... SELECT per changed field, then a single UPDATE ...
+        WHERE id IN (...). With scoped=True only issues in the given
+        company/department are changed (the can_access_issue rule for HODs).
+        Issues that already have every value are left untouched. Returns the
+        number of issues updated.
+        """
+        updates = {field: value for field, value in updates.items() if field in Issue.BULK_FIELDS}
+        for field, allowed in (('status', Issue.STATUSES), ('priority', Issue.PRIORITIES),
+                               ('category', Issue.CATEGORIES)):
+            if field in updates and updates[field] not in allowed:
+                raise ValueError(f"Invalid {field} '{updates[field]}'")
+
+        issue_ids = sorted({int(issue_id) for issue_id in issue_ids})
+        if not updates or not issue_ids:
+            return 0
+
+        where = f'id IN ({", ".join("?" * len(issue_ids))})'
+        params = list(issue_ids)
+        if scoped:
+            where += ' AND company IS ? AND department IS ?'
+            params += [company, department]
+
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            changed = ' OR '.join(f'{field} IS NOT ?' for field in updates)
+            cursor.execute(f'SELECT DISTINCT company, department FROM issues WHERE {where} AND ({changed})',
+                           params + list(updates.values()))
+            scopes = [tuple(row) for row in cursor.fetchall()]
+
+            # Log each field change from the current values before they are overwritten
+            for field, new_value in updates.items():
+                cursor.execute(f'''
+                    INSERT INTO audit_log (username, issue_id, action, field_name, old_value, new_value)
+                    SELECT ?, id, 'Updated', ?, CAST({field} AS TEXT), ? FROM issues
+                    WHERE {where} AND {field} IS NOT ? ORDER BY id
+                ''', [username, field, new_value] + params + [new_value])
+
+            assignments = ', '.join(f'{field} = ?' for field in updates)
+            cursor.execute(f'''
+                UPDATE issues SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                WHERE {where} AND ({changed})
+            ''', list(updates.values()) + params + list(updates.values()))
+            updated = cursor.rowcount
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for issue_company, issue_department in scopes:
+            result_cache.invalidate_scope(issue_company, issue_department)
+        return updated
 
     @staticmethod
-    def delete(issue_id, username, db_path='issue_tracker.db'):
+    def delete(issue_id, username, db_path=None):
         """Delete an issue and log the deletion"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
-        # Get issue data before deletion
-        cursor.execute('SELECT * FROM issues WHERE id = ?', (issue_id,))
-        issue = dict(cursor.fetchone())
-
-        # Log the deletion
-        AuditLog.log_action(
-            username=username,
-            issue_id=issue_id,
-            action='Deleted',
-            field_name='Issue',
-            old_value=issue['title'],
-            new_value=None,
-            conn=conn
-        )
+        try:
+            # Get issue data before deletion
+            cursor.execute('SELECT * FROM issues WHERE id = ?', (issue_id,))
+            issue = dict(cursor.fetchone())
+
+            # Log the deletion
+            AuditLog.log_action(
+                username=username,
+                issue_id=issue_id,
+                action='Deleted',
+                field_name='Issue',
+                old_value=issue['title'],
+                new_value=None,
+                conn=conn
+            )
 
-        # Delete the issue
-        cursor.execute('DELETE FROM issues WHERE id = ?', (issue_id,))
+            # Delete the issue
+            cursor.execute('DELETE FROM issues WHERE id = ?', (issue_id,))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        result_cache.invalidate_scope(issue['company'], issue['department'])
+
+
+class IssueCounters:
+    """
+    Pre-aggregated issue counts per (company, department, status, priority,
+    category), maintained by triggers on issues
+    """
+
+    # Recount query producing rows in the issue_counters layout
+    RECOUNT_QUERY = '''
+        SELECT IFNULL(company, '') AS company, IFNULL(department, '') AS department,
+               status, priority, category, COUNT(*) AS issue_count
+        FROM issues
+        GROUP BY IFNULL(company, ''), IFNULL(department, ''), status, priority, category
+    '''
+
+    @staticmethod
+    def exists(conn):
+        """Check whether the issue_counters table exists in this database"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='issue_counters'")
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def rebuild(cursor=None, db_path=None):
+        """
+        Recount issue_counters from the issues table. When a cursor is given the
+        caller owns the transaction; otherwise the rebuild is committed here.
+        """
+        should_commit = cursor is None
+        if cursor is None:
+            conn = get_db(db_path)
+            cursor = conn.cursor()
+
+        try:
+            cursor.execute('DELETE FROM issue_counters')
+            cursor.execute('''
+                INSERT INTO issue_counters (company, department, status, priority, category, issue_count)
+            ''' + IssueCounters.RECOUNT_QUERY)
+            if should_commit:
+                conn.commit()
+        except Exception:
+            if should_commit:
+                conn.rollback()
+            raise
+
+    @staticmethod
+    def verify(db_path=None):
+        """
+        Compare issue_counters against a fresh count of issues.
+        Returns a list of drifted rows as dicts with stored and actual counts.
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            WITH actual AS ({IssueCounters.RECOUNT_QUERY})
+            SELECT company, department, status, priority, category,
+                   SUM(stored) AS stored, SUM(actual) AS actual
+            FROM (
+                SELECT company, department, status, priority, category,
+                       issue_count AS stored, 0 AS actual
+                FROM issue_counters
+                UNION ALL
+                SELECT company, department, status, priority, category,
+                       0 AS stored, issue_count AS actual
+                FROM actual
+            )
+            GROUP BY company, department, status, priority, category
+            HAVING SUM(stored) != SUM(actual)
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
 
 
 class AuditLog:
     """Audit log model"""
 
+    ACTIONS = ('Created', 'Updated', 'Deleted')
+
+    # Field names recorded by issue creation/deletion ('Issue') and edits
+    FIELD_NAMES = ('Issue', 'title', 'description', 'company', 'department', 'application',
+                   'category', 'priority', 'status', 'assigned_to')
+
+    # Audit browser filters mapped to their (indexed) conditions
+    FILTERS = {
+        'username': 'username = ?',
+        'issue_id': 'issue_id = ?',
+        'action': 'action = ?',
+        'field_name': 'field_name = ?',
+        'since': 'timestamp >= ?',
+        'until': 'timestamp < ?',
+    }
+
+    # Newest first; id breaks ties between entries logged in the same second
+    SORT_TERMS = [('timestamp', 'timestamp', True), ('id', 'id', True)]
+
+    COLUMNS = 'id, timestamp, username, issue_id, action, field_name, old_value, new_value'
+
+    # Per-year cold storage files written by archive()
+    ARCHIVE_FILENAME = 'audit_log_{year}.db'
+
+    # Archives attached to one connection at a time (SQLite allows 10 by default)
+    ARCHIVE_ATTACH_LIMIT = 8
+
     @staticmethod
-    def log_action(username, issue_id, action, field_name, old_value, new_value, conn=None, db_path='issue_tracker.db'):
+    def log_action(username, issue_id, action, field_name, old_value, new_value, conn=None, db_path=None):
         """Log an action to the audit trail"""
-        should_close = False
+        should_commit = False
         if conn is None:
-            conn = sqlite3.connect(db_path)
-            should_close = True
+            conn = get_db(db_path)
+            should_commit = True
 
         cursor = conn.cursor()
         cursor.execute('''
@@ -457,291 +1393,908 @@ class AuditLog:
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (username, issue_id, action, field_name, old_value, new_value))
 
-        if should_close:
+        if should_commit:
             conn.commit()
-            conn.close()
 
     @staticmethod
-    def get_all(db_path='issue_tracker.db'):
+    def log_many(entries, conn=None, db_path=None):
+        """
+        Log several actions with one batched INSERT. Each entry is a dict with
+        the log_action() fields (username, issue_id, action, field_name,
+        old_value, new_value). When conn is given the caller owns the
+        transaction; otherwise the entries are committed here.
+        """
+        should_commit = False
+        if conn is None:
+            conn = get_db(db_path)
+            should_commit = True
+
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO audit_log (username, issue_id, action, field_name, old_value, new_value)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(entry['username'], entry['issue_id'], entry['action'], entry.get('field_name'),
+               entry.get('old_value'), entry.get('new_value')) for entry in entries])
+
+        if should_commit:
+            conn.commit()
+
+    @staticmethod
+    def get_all(db_path=None):
         """Get all audit log entries"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM audit_log ORDER BY timestamp DESC')
         logs = cursor.fetchall()
-        conn.close()
         return [dict(log) for log in logs]
 
     @staticmethod
-    def get_by_issue(issue_id, db_path='issue_tracker.db'):
-        """Get audit log entries for a specific issue"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+    def paginate(filters=None, page_size=100, after=None, before=None, db_path=None):
+        """
+        Get one page of audit log entries, newest first, using keyset
+        pagination on (timestamp, id). Every filter is served by an index and
+        the cursor condition is a range on it, so a page costs the same
+        however large the log grows. Returns a dict with
+        the entries and the cursors for the neighbouring pages.
+        """
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM audit_log WHERE issue_id = ? ORDER BY timestamp DESC', (issue_id,))
-        logs = cursor.fetchall()
-        conn.close()
-        return [dict(log) for log in logs]
+        conditions = []
+        params = []
+        for name, value in (filters or {}).items():
+            if value not in (None, '') and name in AuditLog.FILTERS:
+                conditions.append(AuditLog.FILTERS[name])
+                params.append(value)
+
+        terms = AuditLog.SORT_TERMS
+        reverse = False
+        position = None
+        if after:
+            position = Issue.decode_cursor(after, len(terms))
+        elif before:
+            position = Issue.decode_cursor(before, len(terms))
+            reverse = position is not None
+
+        if position is not None:
+            # A row value comparison is one range on the (timestamp, rowid) index,
+            # so a deep page seeks to the cursor instead of scanning from the newest entry
+            conditions.append(f'(timestamp, id) {">" if reverse else "<"} (?, ?)')
+            params.extend(position)
+
+        direction = 'ASC' if reverse else 'DESC'
+        query = 'SELECT * FROM audit_log'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY timestamp {direction}, id {direction} LIMIT ?'
+        params.append(page_size + 1)
+
+        cursor.execute(query, params)
+        logs = [dict(log) for log in cursor.fetchall()]
+
+        has_more = len(logs) > page_size
+        logs = logs[:page_size]
+        if reverse:
+            logs.reverse()
+
+        has_next = has_more if not reverse else True
+        has_prev = position is not None if not reverse else has_more
+
+        return {
+            'logs': logs,
+            'next_cursor': Issue.encode_cursor([logs[-1]['timestamp'], logs[-1]['id']]) if logs and has_next else None,
+            'prev_cursor': Issue.encode_cursor([logs[0]['timestamp'], logs[0]['id']]) if logs and has_prev else None,
+        }
+
+    @staticmethod
+    def get_by_issue(issue_id, db_path=None, archive_dir=None):
+        """
+        Get audit log entries for a specific issue, newest first, from the live
+        table and every archive file (attached read-only for the query)
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f'SELECT {AuditLog.COLUMNS} FROM audit_log WHERE issue_id = ?', (issue_id,))
+        logs = [dict(log) for log in cursor.fetchall()]
+
+        archives = AuditLog.list_archives(archive_dir)
+        for start in range(0, len(archives), AuditLog.ARCHIVE_ATTACH_LIMIT):
+            group = archives[start:start + AuditLog.ARCHIVE_ATTACH_LIMIT]
+            names = [f'audit_archive_{i}' for i in range(len(group))]
+            attached = []
+            try:
+                for name, path in zip(names, group):
+                    uri = Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+                    cursor.execute(f'ATTACH DATABASE ? AS {name}', (uri,))
+                    attached.append(name)
+                query = ' UNION ALL '.join(
+                    f'SELECT {AuditLog.COLUMNS} FROM {name}.audit_log WHERE issue_id = ?' for name in attached
+                )
+                cursor.execute(query, [issue_id] * len(attached))
+                logs.extend(dict(log) for log in cursor.fetchall())
+            finally:
+                for name in attached:
+                    cursor.execute(f'DETACH DATABASE {name}')
+
+        logs.sort(key=lambda log: (log['timestamp'] or '', log['id']), reverse=True)
+        return logs
+
+    @staticmethod
+    def list_archives(archive_dir=None):
+        """Get the paths of the per-year audit archive files, oldest first"""
+        archive_dir = archive_dir or Config.AUDIT_ARCHIVE_FOLDER
+        pattern = os.path.join(glob.escape(archive_dir), AuditLog.ARCHIVE_FILENAME.format(year='[0-9]' * 4))
+        return sorted(glob.glob(pattern))
+
+    @staticmethod
+    def archive(older_than_days=None, archive_dir=None, batch_size=1000, db_path=None):
+        """
+        Move audit log entries older than the given number of days (default
+        AUDIT_ARCHIVE_DAYS) into per-year archive files. Each batch is copied
+        and committed before it is deleted from the live table, so an
+        interrupted run leaves no entry missing and can simply be re-run.
+        Returns the number of entries moved per year.
+        """
+        if older_than_days is None:
+            older_than_days = Config.AUDIT_ARCHIVE_DAYS
+        archive_dir = archive_dir or Config.AUDIT_ARCHIVE_FOLDER
+
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+        conn.commit()
+
+        # Timestamps are stored by CURRENT_TIMESTAMP, so compare in SQLite's UTC clock
+        cursor.execute("SELECT datetime('now', ?)", (f'-{int(older_than_days)} days',))
+        cutoff = cursor.fetchone()[0]
+
+        cursor.execute("SELECT DISTINCT substr(timestamp, 1, 4) FROM audit_log WHERE timestamp < ?", (cutoff,))
+        years = sorted(row[0] for row in cursor.fetchall() if row[0] and row[0].isdigit())
+
+        moved = {}
+        if not years:
+            return moved
+        os.makedirs(archive_dir, exist_ok=True)
+
+        for year in years:
+            path = os.path.join(archive_dir, AuditLog.ARCHIVE_FILENAME.format(year=year))
+            start = f'{year}-01-01'
+            end = min(f'{int(year) + 1}-01-01', cutoff)
+
+            cursor.execute('ATTACH DATABASE ? AS audit_archive', (path,))
+            try:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_archive.audit_log (
+                        id INTEGER PRIMARY KEY,
+                        timestamp TIMESTAMP,
+                        username TEXT NOT NULL,
+                        issue_id INTEGER,
+                        action TEXT NOT NULL,
+                        field_name TEXT,
+                        old_value TEXT,
+                        new_value TEXT
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS audit_archive.idx_audit_log_issue_timestamp '
+                               'ON audit_log (issue_id, timestamp)')
+                conn.commit()
+
+                moved[year] = 0
+                while True:
+                    cursor.execute('''
+                        SELECT id FROM main.audit_log
+                        WHERE timestamp >= ? AND timestamp < ?
+                        ORDER BY timestamp LIMIT ?
+                    ''', (start, end, batch_size))
+                    ids = [row[0] for row in cursor.fetchall()]
+                    if not ids:
+                        break
+
+                    placeholders = ', '.join('?' * len(ids))
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO audit_archive.audit_log ({AuditLog.COLUMNS})
+                        SELECT {AuditLog.COLUMNS} FROM main.audit_log WHERE id IN ({placeholders})
+                    ''', ids)
+                    conn.commit()
+                    cursor.execute(f'DELETE FROM main.audit_log WHERE id IN ({placeholders})', ids)
+                    conn.commit()
+                    moved[year] += len(ids)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.execute('DETACH DATABASE audit_archive')
+
+        return moved
 
 
 class Document:
     """Document model for issue attachments"""
 
     @staticmethod
-    def create(issue_id, filename, original_filename, file_size, uploaded_by, db_path='issue_tracker.db'):
+    def get_by_issue(issue_id, db_path=None, archive_dir=None):
+        """
+        Get audit log entries for a specific issue, newest first, from the live
+        table and every archive file (attached read-only for the query)
+        """
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(f'SELECT {AuditLog.COLUMNS} FROM audit_log WHERE issue_id = ?', (issue_id,))
+        logs = [dict(log) for log in cursor.fetchall()]
+
+        archives = AuditLog.list_archives(archive_dir)
+        for start in range(0, len(archives), AuditLog.ARCHIVE_ATTACH_LIMIT):
+            group = archives[start:start + AuditLog.ARCHIVE_ATTACH_LIMIT]
+            names = [f'audit_archive_{i}' for i in range(len(group))]
+            attached = []
+            try:
+                for name, path in zip(names, group):
+                    uri = Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+                    cursor.execute(f'ATTACH DATABASE ? AS {name}', (uri,))
+                    attached.append(name)
+                query = ' UNION ALL '.join(
+                    f'SELECT {AuditLog.COLUMNS} FROM {name}.audit_log WHERE issue_id = ?' for name in attached
+                )
+                cursor.execute(query, [issue_id] * len(attached))
+                logs.extend(dict(log) for log in cursor.fetchall())
+            finally:
+                for name in attached:
+                    cursor.execute(f'DETACH DATABASE {name}')
+
+        logs.sort(key=lambda log: (log['timestamp'] or '', log['id']), reverse=True)
+        return logs
+
+    @staticmethod
+    def list_archives(archive_dir=None):
+        """Get the paths of the per-year audit archive files, oldest first"""
+        archive_dir = archive_dir or Config.AUDIT_ARCHIVE_FOLDER
+        pattern = os.path.join(glob.escape(archive_dir), AuditLog.ARCHIVE_FILENAME.format(year='[0-9]' * 4))
+        return sorted(glob.glob(pattern))
+
+    @staticmethod
+    def archive(older_than_days=None, archive_dir=None, batch_size=1000, db_path=None):
+        """
+        Move audit log entries older than the given number of days (default
+        AUDIT_ARCHIVE_DAYS) into per-year archive files. Each batch is copied
+        and committed before it is deleted from the live table, so an
+        interrupted run leaves no entry missing and can simply be re-run.
+        Returns the number of entries moved per year.
+        """
+        if older_than_days is None:
+            older_than_days = Config.AUDIT_ARCHIVE_DAYS
+        archive_dir = archive_dir or Config.AUDIT_ARCHIVE_FOLDER
+
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+        conn.commit()
+
+        # Timestamps are stored by CURRENT_TIMESTAMP, so compare in SQLite's UTC clock
+        cursor.execute("SELECT datetime('now', ?)", (f'-{int(older_than_days)} days',))
+        cutoff = cursor.fetchone()[0]
+
+        cursor.execute("SELECT DISTINCT substr(timestamp, 1, 4) FROM audit_log WHERE timestamp < ?", (cutoff,))
+        years = sorted(row[0] for row in cursor.fetchall() if row[0] and row[0].isdigit())
+
+        moved = {}
+        if not years:
+            return moved
+        os.makedirs(archive_dir, exist_ok=True)
+
+        for year in years:
+            path = os.path.join(archive_dir, AuditLog.ARCHIVE_FILENAME.format(year=year))
+            start = f'{year}-01-01'
+            end = min(f'{int(year) + 1}-01-01', cutoff)
+
+            cursor.execute('ATTACH DATABASE ? AS audit_archive', (path,))
+            try:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_archive.audit_log (
+                        id INTEGER PRIMARY KEY,
+                        timestamp TIMESTAMP,
+                        username TEXT NOT NULL,
+                        issue_id INTEGER,
+                        action TEXT NOT NULL,
+                        field_name TEXT,
+                        old_value TEXT,
+                        new_value TEXT
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS audit_archive.idx_audit_log_issue_timestamp '
+                               'ON audit_log (issue_id, timestamp)')
+                conn.commit()
+
+                moved[year] = 0
+                while True:
+                    cursor.execute('''
+                        SELECT id FROM main.audit_log
+                        WHERE timestamp >= ? AND timestamp < ?
+                        ORDER BY timestamp LIMIT ?
+                    ''', (start, end, batch_size))
+                    ids = [row[0] for row in cursor.fetchall()]
+                    if not ids:
+                        break
+
+                    placeholders = ', '.join('?' * len(ids))
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO audit_archive.audit_log ({AuditLog.COLUMNS})
+                        SELECT {AuditLog.COLUMNS} FROM main.audit_log WHERE id IN ({placeholders})
+                    ''', ids)
+                    conn.commit()
+                    cursor.execute(f'DELETE FROM main.audit_log WHERE id IN ({placeholders})', ids)
+                    conn.commit()
+                    moved[year] += len(ids)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.execute('DETACH DATABASE audit_archive')
+
+        return moved
+
+
+class Document:
+    """Document model for issue attachments"""
+
+    @staticmethod
+    def create(issue_id, filename, original_filename, file_size, uploaded_by, sha256=None, db_path=None):
         """Create a new document record"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
-            INSERT INTO documents (issue_id, filename, original_filename, file_size, uploaded_by)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (issue_id, filename, original_filename, file_size, uploaded_by))
+            INSERT INTO documents (issue_id, filename, original_filename, file_size, uploaded_by, sha256)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (issue_id, filename, original_filename, file_size, uploaded_by, sha256))
 
         document_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         return document_id
 
     @staticmethod
-    def get_by_issue(issue_id, db_path='issue_tracker.db'):
+    def get_by_issue(issue_id, db_path=None):
         """Get all documents for a specific issue"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM documents WHERE issue_id = ? ORDER BY uploaded_at DESC', (issue_id,))
         documents = cursor.fetchall()
-        conn.close()
         return [dict(doc) for doc in documents]
 
     @staticmethod
-    def get_by_id(document_id, db_path='issue_tracker.db'):
+    def get_by_id(document_id, db_path=None):
         """Get document by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM documents WHERE id = ?', (document_id,))
         document = cursor.fetchone()
-        conn.close()
         return dict(document) if document else None
 
     @staticmethod
-    def delete(document_id, db_path='issue_tracker.db'):
-        """Delete a document record"""
-        conn = sqlite3.connect(db_path)
+    def blob_filename(sha256):
+        """Path (relative to the uploads folder) of the stored file with this content"""
+        return f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+    @staticmethod
+    def attach(issue_id, upload, original_filename, uploaded_by, upload_folder=None, db_path=None):
+        """
+        Create a document from a finished upload (an uploads.UploadStream),
+        storing its content once under its SHA-256. If the same content is
+        already stored, the new document shares that file and the upload is
+        discarded. Returns the new document ID.
+        """
+        upload_folder = upload_folder or Config.UPLOAD_FOLDER
+        filename = Document.blob_filename(upload.sha256)
+        file_path = os.path.join(upload_folder, filename)
+
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+
+        # Hold the write lock while placing the file so a concurrent delete of
+        # the last document with this content can't remove it in between
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            if not os.path.exists(file_path):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                upload.commit(file_path)
+
+            cursor.execute('''
+                INSERT INTO documents (issue_id, filename, original_filename, file_size, uploaded_by, sha256)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (issue_id, filename, original_filename, upload.size, uploaded_by, upload.sha256))
+
+            document_id = cursor.lastrowid
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return document_id
+
+    @staticmethod
+    def delete(document_id, upload_folder=None, db_path=None):
+        """
+        Delete a document record and release its stored file, which is
+        removed once no other document uses it. Returns the number of bytes
+        freed on disk.
+        """
+        upload_folder = upload_folder or Config.UPLOAD_FOLDER
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('SELECT filename, sha256 FROM documents WHERE id = ?', (document_id,))
+            document = cursor.fetchone()
+            if document is None:
+                conn.rollback()
+                return 0
+
+            cursor.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+
+            release = []
+            if document['sha256'] is None or document['filename'] != Document.blob_filename(document['sha256']):
+                # Uploaded before shared storage: the file belongs to this document alone
+                release.append(document['filename'])
+            if document['sha256'] is not None:
+                cursor.execute('SELECT ref_count FROM document_blobs WHERE sha256 = ?', (document['sha256'],))
+                blob = cursor.fetchone()
+                if blob is not None and blob['ref_count'] <= 0:
+                    cursor.execute('DELETE FROM document_blobs WHERE sha256 = ?', (document['sha256'],))
+                    release.append(Document.blob_filename(document['sha256']))
+
+            freed = 0
+            for filename in release:
+                file_path = os.path.join(upload_folder, filename)
+                if os.path.exists(file_path):
+                    freed += os.path.getsize(file_path)
+                    os.remove(file_path)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return freed
+
+    @staticmethod
+    def consolidate_storage(upload_folder=None, db_path=None):
+        """
+        Move documents uploaded before shared storage into it: hash each file,
+        point the document at the shared copy of its content and remove the
+        duplicate. Returns (documents moved, duplicates removed, bytes freed,
+        documents whose file is missing).
+        """
+        upload_folder = upload_folder or Config.UPLOAD_FOLDER
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, filename, sha256 FROM documents ORDER BY id')
+        documents = [dict(row) for row in cursor.fetchall()]
+
+        moved = duplicates = freed = missing = 0
+        for document in documents:
+            if document['sha256'] and document['filename'] == Document.blob_filename(document['sha256']):
+                continue
+
+            source_path = os.path.join(upload_folder, document['filename'])
+            if not os.path.exists(source_path):
+                missing += 1
+                continue
+
+            digest = hashlib.sha256()
+            with open(source_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+            filename = Document.blob_filename(sha256)
+            target_path = os.path.join(upload_folder, filename)
+
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                size = os.path.getsize(source_path)
+                if os.path.exists(target_path):
+                    os.remove(source_path)
+                    duplicates += 1
+                    freed += size
+                else:
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    os.replace(source_path, target_path)
+                cursor.execute('UPDATE documents SET filename = ?, sha256 = ?, file_size = ? WHERE id = ?',
+                               (filename, sha256, size, document['id']))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            moved += 1
+
+        return moved, duplicates, freed, missing
+
+
+    @staticmethod
+    def _iter_filenames(conn, batch_size):
+        """Yield the distinct stored filenames of all documents in sorted order, one batch at a time"""
+        cursor = conn.cursor()
+        last = ''
+        while True:
+            cursor.execute('SELECT DISTINCT filename FROM documents WHERE filename > ? ORDER BY filename LIMIT ?',
+                           (last, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['filename']
+            last = rows[-1]['filename']
+
+    @staticmethod
+    def _iter_files(folder, prefix=''):
+        """
+        Yield (relative path, full path) for every file below folder, in the
+        same order as the sorted relative paths (sorting directories by
+        'name/'). Only one directory listing is held at a time.
+        """
+        with os.scandir(folder) as entries:
+            listing = sorted((entry.name + '/' if entry.is_dir(follow_symlinks=False) else entry.name, entry.path)
+                             for entry in entries)
+        for name, path in listing:
+            if name.endswith('/'):
+                yield from Document._iter_files(path, prefix + name)
+            else:
+                yield prefix + name, path
+
+    @staticmethod
+    def collect_garbage(upload_folder=None, delete=False, batch_size=1000, temp_age=86400, db_path=None):
+        """
+        Find (and with delete=True remove) what deleted issues and restores
+        leave behind: documents whose issue no longer exists, and files in the
+        uploads folder that no document refers to (including upload temp files
+        older than temp_age seconds). Documents whose file is missing are only
+        reported, since a wrong UPLOAD_FOLDER would otherwise delete them all;
+        likewise no files are removed while there are no documents at all (a
+        new or reset database pointed at an existing uploads folder).
+        Both the documents table and the folder are read in sorted batches and
+        merged, so memory use doesn't grow with the number of files.
+        Returns a dict of counts and the bytes held by orphaned files.
+        """
+        upload_folder = upload_folder or Config.UPLOAD_FOLDER
+        conn = get_db(db_path)
+        cursor = conn.cursor()
+        report = {'orphan_documents': 0, 'missing_files': 0, 'orphan_files': 0, 'orphan_bytes': 0,
+                  'removed_files': 0}
+
+        # Documents left behind by issues deleted before foreign keys were enforced
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT d.id FROM documents d LEFT JOIN issues i ON i.id = d.issue_id
+                WHERE d.id > ? AND i.id IS NULL ORDER BY d.id LIMIT ?
+            ''', (last_id, batch_size))
+            ids = [row['id'] for row in cursor.fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+            report['orphan_documents'] += len(ids)
+            if delete:
+                placeholders = ','.join('?' * len(ids))
+                cursor.execute(f'DELETE FROM documents WHERE id IN ({placeholders})', ids)
+                conn.commit()
+        if delete:
+            cursor.execute('DELETE FROM document_blobs WHERE ref_count <= 0')
+            conn.commit()
+
+        if not os.path.isdir(upload_folder):
+            return report
+
+        cursor.execute('SELECT 1 FROM documents LIMIT 1')
+        remove = delete and cursor.fetchone() is not None
+
+        # Merge the sorted filenames with the sorted folder listing
+        now = datetime.now().timestamp()
+        candidates = []
+
+        def remove_files(candidates):
+            # Re-check under the write lock: an upload may have claimed the file since
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for filename, path, size in candidates:
+                    cursor.execute('SELECT 1 FROM documents WHERE filename = ? LIMIT 1', (filename,))
+                    if cursor.fetchone() is None and os.path.exists(path):
+                        os.remove(path)
+                        report['removed_files'] += 1
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        filenames = Document._iter_filenames(conn, batch_size)
+        referenced = next(filenames, None)
+        for filename, path in Document._iter_files(upload_folder):
+            while referenced is not None and referenced < filename:
+                # Referenced by a document but not on disk
+                report['missing_files'] += 1
+                referenced = next(filenames, None)
+            if referenced == filename:
+                referenced = next(filenames, None)
+                continue
+
+            stat = os.stat(path)
+            if os.path.basename(filename).startswith('.upload_') and now - stat.st_mtime < temp_age:
+                continue  # Upload in progress
+            report['orphan_files'] += 1
+            report['orphan_bytes'] += stat.st_size
+            if remove:
+                candidates.append((filename, path, stat.st_size))
+                if len(candidates) >= batch_size:
+                    remove_files(candidates)
+                    candidates = []
+        while referenced is not None:
+            report['missing_files'] += 1
+            referenced = next(filenames, None)
+        if candidates:
+            remove_files(candidates)
+
+        # Drop storage directories emptied by the removals
+        if remove:
+            for root, dirs, files in os.walk(upload_folder, topdown=False):
+                if root != upload_folder and not os.listdir(root):
+                    os.rmdir(root)
+        return report
+
+
+class DataGeneration:
+    """
+    Version row that changes whenever the whole database is replaced by a
+    restore or reset. Every worker compares it on each request (one primary
+    key lookup), so caches and sessions from before the change are dropped
+    in all processes, not only the one that ran the job.
+    """
+
+    # Generation each database's caches were filled under in this process
+    _seen = {}
+
+    @staticmethod
+    def current(db_path=None):
+        """Get the current generation, or None if it isn't tracked"""
+        try:
+            row = get_db(db_path).execute("SELECT version FROM data_versions WHERE name = 'generation'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    @staticmethod
+    def check(db_path=None):
+        """Get the current generation, first dropping this process's caches if it has changed"""
+        generation = DataGeneration.current(db_path)
+        key = db_path or DEFAULT_DB_PATH
+        if DataGeneration._seen.get(key, generation) != generation:
+            result_cache.clear()
+            user_cache.clear()
+            ReferenceData.invalidate()
+        DataGeneration._seen[key] = generation
+        return generation
+
+    @staticmethod
+    def bump(db_path=None):
+        """Give the database a new generation after replacing its contents"""
+        conn = get_db(db_path)
+        conn.execute("INSERT OR REPLACE INTO data_versions (name, version) VALUES ('generation', random())")
         conn.commit()
-        conn.close()
+
+
+class ReferenceData:
+    """
+    Process-local cache of the companies, departments and applications lists.
+    Each read checks the data_versions row (one primary key lookup) instead
+    of reloading the table, so changes made by other workers are picked up
+    on their next request.
+    """
+
+    TABLES = ('companies', 'departments', 'applications')
+
+    @staticmethod
+    def version(conn):
+        """Get the current reference data version, or None if it isn't tracked"""
+        try:
+            row = conn.execute("SELECT version FROM data_versions WHERE name = 'reference'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    @staticmethod
+    def get_all(table, db_path=None):
+        """Get all rows of a reference table ordered by name"""
+        conn = get_db(db_path)
+        version = ReferenceData.version(conn)
+        key = (db_path or DEFAULT_DB_PATH, table)
+
+        rows = reference_cache.get(key, version) if version is not None else None
+        if rows is None:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT * FROM {table} ORDER BY name')
+            rows = [dict(row) for row in cursor.fetchall()]
+            if version is not None:
+                reference_cache.set(key, version, rows)
+
+        # Hand out copies so callers can't modify the cached rows
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def invalidate():
+        """Drop this process's cached reference data after a write"""
+        reference_cache.clear()
 
 
 class Company:
     """Company model"""
 
     @staticmethod
-    def create(name, db_path='issue_tracker.db'):
+    def create(name, db_path=None):
         """Create a new company"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('INSERT INTO companies (name) VALUES (?)', (name,))
             conn.commit()
-            company_id = cursor.lastrowid
-            conn.close()
-            return company_id
+            ReferenceData.invalidate()
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return None
 
     @staticmethod
-    def get_all(db_path='issue_tracker.db'):
+    def get_all(db_path=None):
         """Get all companies"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM companies ORDER BY name')
-        companies = cursor.fetchall()
-        conn.close()
-        return [dict(company) for company in companies]
+        return ReferenceData.get_all('companies', db_path)
 
     @staticmethod
-    def get_by_id(company_id, db_path='issue_tracker.db'):
+    def get_by_id(company_id, db_path=None):
         """Get company by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM companies WHERE id = ?', (company_id,))
         company = cursor.fetchone()
-        conn.close()
         return dict(company) if company else None
 
     @staticmethod
-    def update(company_id, name, db_path='issue_tracker.db'):
+    def update(company_id, name, db_path=None):
         """Update company name"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('UPDATE companies SET name = ? WHERE id = ?', (name, company_id))
             conn.commit()
-            conn.close()
+            ReferenceData.invalidate()
             return True
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return False
 
     @staticmethod
-    def delete(company_id, db_path='issue_tracker.db'):
+    def delete(company_id, db_path=None):
         """Delete a company"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM companies WHERE id = ?', (company_id,))
         conn.commit()
-        conn.close()
+        ReferenceData.invalidate()
 
 
 class Department:
     """Department model"""
 
     @staticmethod
-    def create(name, db_path='issue_tracker.db'):
+    def create(name, db_path=None):
         """Create a new department"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('INSERT INTO departments (name) VALUES (?)', (name,))
             conn.commit()
-            department_id = cursor.lastrowid
-            conn.close()
-            return department_id
+            ReferenceData.invalidate()
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return None
 
     @staticmethod
-    def get_all(db_path='issue_tracker.db'):
+    def get_all(db_path=None):
         """Get all departments"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM departments ORDER BY name')
-        departments = cursor.fetchall()
-        conn.close()
-        return [dict(dept) for dept in departments]
+        return ReferenceData.get_all('departments', db_path)
 
     @staticmethod
-    def get_by_id(department_id, db_path='issue_tracker.db'):
+    def get_by_id(department_id, db_path=None):
         """Get department by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM departments WHERE id = ?', (department_id,))
         department = cursor.fetchone()
-        conn.close()
         return dict(department) if department else None
 
     @staticmethod
-    def update(department_id, name, db_path='issue_tracker.db'):
+    def update(department_id, name, db_path=None):
         """Update department name"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('UPDATE departments SET name = ? WHERE id = ?', (name, department_id))
             conn.commit()
-            conn.close()
+            ReferenceData.invalidate()
             return True
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return False
 
     @staticmethod
-    def delete(department_id, db_path='issue_tracker.db'):
+    def delete(department_id, db_path=None):
         """Delete a department"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM departments WHERE id = ?', (department_id,))
         conn.commit()
-        conn.close()
+        ReferenceData.invalidate()
 
 
 class Application:
     """Application model"""
 
     @staticmethod
-    def create(name, db_path='issue_tracker.db'):
+    def create(name, db_path=None):
         """Create a new application"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('INSERT INTO applications (name) VALUES (?)', (name,))
             conn.commit()
-            application_id = cursor.lastrowid
-            conn.close()
-            return application_id
+            ReferenceData.invalidate()
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return None
 
     @staticmethod
-    def get_all(db_path='issue_tracker.db'):
+    def get_all(db_path=None):
         """Get all applications"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM applications ORDER BY name')
-        applications = cursor.fetchall()
-        conn.close()
-        return [dict(app) for app in applications]
+        return ReferenceData.get_all('applications', db_path)
 
     @staticmethod
-    def get_by_id(application_id, db_path='issue_tracker.db'):
+    def get_by_id(application_id, db_path=None):
         """Get application by ID"""
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM applications WHERE id = ?', (application_id,))
         application = cursor.fetchone()
-        conn.close()
         return dict(application) if application else None
 
     @staticmethod
-    def update(application_id, name, db_path='issue_tracker.db'):
+    def update(application_id, name, db_path=None):
         """Update application name"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute('UPDATE applications SET name = ? WHERE id = ?', (name, application_id))
             conn.commit()
-            conn.close()
+            ReferenceData.invalidate()
             return True
         except sqlite3.IntegrityError:
-            conn.close()
+            conn.rollback()
             return False
 
     @staticmethod
-    def delete(application_id, db_path='issue_tracker.db'):
+    def delete(application_id, db_path=None):
         """Delete an application"""
-        conn = sqlite3.connect(db_path)
+        conn = get_db(db_path)
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM applications WHERE id = ?', (application_id,))
         conn.commit()
-        conn.close()
+        ReferenceData.invalidate()
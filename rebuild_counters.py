@@ -0,0 +1,47 @@
+"""
+Issue counter maintenance script for IT Issue Tracker
+Verifies the trigger-maintained issue_counters table against the issues
+table and rebuilds it when they have drifted (e.g. after a restore)
+Usage: python rebuild_counters.py [--verify] [db_path]
+"""
+import sys
+from models import Database, IssueCounters, close_db
+
+
+def rebuild_counters(db_path=None, verify_only=False):
+    """Verify issue counters and rebuild them if they have drifted"""
+    db = Database(db_path)
+    print(f"Checking issue counters in {db.db_path}...")
+
+    # Make sure the counters table and triggers exist
+    db.init_db()
+
+    drift = IssueCounters.verify(db_path=db.db_path)
+    if not drift:
+        print("✓ Issue counters are consistent with the issues table")
+        return True
+
+    print(f"Found {len(drift)} drifted counter(s):")
+    for row in drift:
+        scope = ' / '.join(value or '-' for value in (row['company'], row['department']))
+        print(f"  {scope} | {row['status']} | {row['priority']} | {row['category']}: "
+              f"stored {row['stored']}, actual {row['actual']}")
+
+    if verify_only:
+        return False
+
+    IssueCounters.rebuild(db_path=db.db_path)
+    print("✓ Issue counters rebuilt")
+    return True
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    verify_only = '--verify' in args
+    args = [arg for arg in args if arg != '--verify']
+
+    try:
+        success = rebuild_counters(args[0] if args else None, verify_only)
+    finally:
+        close_db()
+    sys.exit(0 if success else 1)
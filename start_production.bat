@@ -71,7 +71,7 @@ echo =====================================
 echo.
 
 REM Start with gunicorn (production) or Flask (development fallback)
-gunicorn --bind 0.0.0.0:8000 --workers 4 app:app 2>nul
+gunicorn --bind 0.0.0.0:8000 --workers 4 --preload app:app 2>nul
 if errorlevel 1 (
     echo.
     echo Gunicorn not available, starting with Flask development server...
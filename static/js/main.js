@@ -65,7 +65,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Table sorting (basic client-side)
 document.addEventListener('DOMContentLoaded', function() {
-    const tables = document.querySelectorAll('table.table');
+    // Tables marked data-server-sort are sorted (and paginated) by the server
+    const tables = document.querySelectorAll('table.table:not([data-server-sort])');
 
     tables.forEach(function(table) {
         const headers = table.querySelectorAll('th');
@@ -0,0 +1,42 @@
+"""Shared fixtures for the IT Issue Tracker tests"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Keep the app's database, uploads and jobs out of the working tree; set before
+# config is imported
+_data_dir = tempfile.mkdtemp(prefix='tracker_tests_')
+for _name, _folder in (('DATABASE_PATH', 'tracker.db'), ('UPLOAD_FOLDER', 'uploads'), ('JOB_FOLDER', 'jobs'),
+                       ('AUDIT_ARCHIVE_FOLDER', 'archive'), ('BACKUP_STORE_FOLDER', 'store')):
+    os.environ[_name] = os.path.join(_data_dir, _folder)
+os.environ['JOB_WORKER_THREADS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database, close_db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A freshly initialized database in a temporary folder"""
+    path = str(tmp_path / 'tracker.db')
+    Database(path).init_db()
+    yield path
+    close_db()
+
+
+@pytest.fixture
+def admin_client():
+    """A test client logged in as an admin of the app's (temporary) database"""
+    from app import app
+    from models import User
+
+    if not User.get_by_username('admin'):
+        User.create('admin', 'admin123', 'admin')
+    close_db()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    yield client
+    close_db()
@@ -0,0 +1,27 @@
+"""Tests for streamed backup archives"""
+import io
+import zipfile
+
+from backup import Backup
+from models import Document, Issue
+from uploads import UploadStream
+
+
+def test_uploaded_pdf_blob_is_stored_uncompressed(tmp_path, db_path):
+    upload_folder = str(tmp_path / 'uploads')
+    issue_id = Issue.create('Printer', 'Jammed', None, None, None, 'Hardware', 'Low', 'Not Started', None, 'admin',
+                            db_path=db_path)
+    upload = UploadStream(upload_folder, 10 * 1024 * 1024, b'%PDF-')
+    upload.write(b'%PDF-1.4\n' + b'compressible ' * 10000)
+    assert upload.finish() is None
+    Document.attach(issue_id, upload, 'report.pdf', 'admin', upload_folder, db_path=db_path)
+    upload.close()
+
+    archive = b''.join(Backup.stream(db_path, upload_folder, str(tmp_path / 'archive')))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipf:
+        infos = {info.filename: info for info in zipf.infolist()}
+        blob = 'uploads/' + Document.blob_filename(upload.sha256)
+        assert infos[blob].compress_type == zipfile.ZIP_STORED
+        assert infos[Backup.DATABASE_ARCNAME].compress_type == zipfile.ZIP_DEFLATED
+        assert zipf.read(blob).startswith(b'%PDF-1.4')
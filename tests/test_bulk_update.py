@@ -0,0 +1,32 @@
+"""Tests for bulk issue updates"""
+from models import AuditLog, Issue
+
+
+def create_issues(db_path, companies):
+    Issue.create_many([{'title': f'Issue {n}', 'description': 'd', 'company': company, 'department': 'IT',
+                        'category': 'Hardware', 'priority': 'Low', 'status': 'Not Started', 'created_by': 'admin'}
+                       for n, company in enumerate(companies)], 'admin', db_path=db_path)
+
+
+def test_bulk_assignee_rows_match_audit_field_filter(db_path):
+    create_issues(db_path, ['A', 'A', 'B'])
+
+    updated = Issue.bulk_update([1, 2, 3], 'admin', {'assigned_to': 'bob'}, db_path=db_path)
+
+    assert updated == 3
+    assert 'assigned_to' in AuditLog.FIELD_NAMES
+    logs = AuditLog.paginate(filters={'field_name': 'assigned_to'}, db_path=db_path)['logs']
+    assert sorted(log['issue_id'] for log in logs) == [1, 2, 3]
+    assert {(log['old_value'], log['new_value']) for log in logs} == {(None, 'bob')}
+
+
+def test_scoped_bulk_update_skips_other_departments(db_path):
+    create_issues(db_path, ['A', 'B', 'A'])
+
+    updated = Issue.bulk_update([1, 2, 3], 'hod', {'status': 'Closed'}, company='A', department='IT',
+                                scoped=True, db_path=db_path)
+
+    assert updated == 2
+    assert [Issue.get_by_id(n, db_path=db_path)['status'] for n in (1, 2, 3)] == ['Closed', 'Not Started', 'Closed']
+    logs = AuditLog.paginate(filters={'field_name': 'status'}, db_path=db_path)['logs']
+    assert sorted(log['issue_id'] for log in logs) == [1, 3]
@@ -0,0 +1,59 @@
+"""Tests for the streaming CSV/JSON issue import"""
+import io
+import json
+
+from issue_import import IssueImport
+from models import get_db
+
+
+def issue(title):
+    return {'title': title, 'description': 'd', 'category': 'Hardware', 'priority': 'Low'}
+
+
+def records(data):
+    return list(IssueImport.read_json(io.BytesIO(data.encode('utf-8'))))
+
+
+def test_jsonl_bad_line_is_rejected_and_rest_read():
+    data = '\n'.join([json.dumps(issue('a')), '{"title": "broken", ', '', json.dumps(issue('c'))]) + '\n'
+    result = records(data)
+    assert [location for location, _, _ in result] == ['line 1', 'line 2', 'line 4']
+    assert result[0][1]['title'] == 'a' and result[0][2] is None
+    assert result[1][1] is None and result[1][2].startswith('Invalid JSON')
+    assert result[2][1]['title'] == 'c' and result[2][2] is None
+
+
+def test_array_bad_element_is_rejected_and_rest_read(monkeypatch):
+    # Small reads so elements and strings span chunk boundaries
+    monkeypatch.setattr(IssueImport, 'READ_SIZE', 7)
+    good = json.dumps(dict(issue('a, [b] {c} "q" \\'), extra={'nested': [1, 2]}))
+    data = f'[\n  {good},\n  {{"title": nope}},\n  {json.dumps(issue("c"))}\n]\n'
+    result = records(data)
+    assert [location for location, _, _ in result] == ['record 1', 'record 2', 'record 3']
+    assert result[0][1]['title'] == 'a, [b] {c} "q" \\'
+    assert result[1][1] is None and result[1][2].startswith('Invalid JSON')
+    assert result[2][1]['title'] == 'c'
+
+
+def test_oversized_record_is_rejected(monkeypatch):
+    monkeypatch.setattr(IssueImport, 'MAX_RECORD_SIZE', 100)
+    big = json.dumps(issue('x' * 500))
+    for data in (f'{big}\n{json.dumps(issue("b"))}\n', f'[{big}, {json.dumps(issue("b"))}]'):
+        result = records(data)
+        assert result[0][1] is None and 'too large' in result[0][2]
+        assert result[1][1]['title'] == 'b'
+
+
+def test_run_imports_around_bad_line(tmp_path, db_path):
+    lines = [json.dumps(issue(f'issue {n}')) for n in range(5)]
+    lines[2] = '{"title": "issue 2", "description": '
+    path = tmp_path / 'issues.jsonl'
+    path.write_text('\n'.join(lines) + '\n')
+
+    report = IssueImport.run(str(path), 'json', 'admin', chunk_size=2, db_path=db_path)
+
+    assert report['imported'] == 4
+    assert report['rejected'] == 1
+    assert report['errors'][0][0] == 'line 3'
+    titles = [row[0] for row in get_db(db_path).execute('SELECT title FROM issues ORDER BY id')]
+    assert titles == ['issue 0', 'issue 1', 'issue 3', 'issue 4']
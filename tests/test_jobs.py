@@ -0,0 +1,43 @@
+"""Tests for the background job queue"""
+import threading
+import time
+
+from config import Config
+from jobs import JobQueue
+from models import close_db
+
+
+def test_recover_uses_heartbeat_not_run_time(tmp_path, monkeypatch):
+    jobs_db = str(tmp_path / 'jobs.db')
+    monkeypatch.setattr(Config, 'JOB_HEARTBEAT_SECONDS', 0.2)
+    monkeypatch.setattr(Config, 'JOB_STALE_SECONDS', 1)
+
+    started = threading.Event()
+    release = threading.Event()
+
+    @JobQueue.handler('test_slow')
+    def run_slow(job, progress):
+        # Reports no progress while it runs
+        started.set()
+        release.wait(10)
+
+    slow_id = JobQueue.enqueue('test_slow', db_path=jobs_db)
+    worker = threading.Thread(target=JobQueue.run_next, args=(jobs_db,))
+    worker.start()
+    try:
+        assert started.wait(5)
+        # A job claimed by a worker that then died: no heartbeat at all
+        dead_id = JobQueue.enqueue('test_slow', db_path=jobs_db)
+        assert JobQueue.claim(jobs_db)['id'] == dead_id
+
+        time.sleep(2.5)
+        assert JobQueue.recover(jobs_db) == 1
+        assert JobQueue.get(slow_id, jobs_db)['status'] == 'running'
+        assert JobQueue.get(dead_id, jobs_db)['status'] == 'failed'
+    finally:
+        release.set()
+        worker.join()
+        JobQueue.handlers.pop('test_slow', None)
+
+    assert JobQueue.get(slow_id, jobs_db)['status'] == 'done'
+    close_db()
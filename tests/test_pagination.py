@@ -0,0 +1,90 @@
+"""Tests for keyset pagination of the tracker and the audit log"""
+from models import AuditLog, Issue, get_db
+
+
+def create_issues(db_path, count):
+    Issue.create_many([{'title': f'Issue {n % 17}', 'description': 'd', 'company': ('A', 'B', None)[n % 3],
+                        'department': 'IT', 'category': 'Hardware', 'priority': Issue.PRIORITIES[n % 4],
+                        'status': 'Not Started', 'created_by': 'admin',
+                        # Several issues share each timestamp so ties are broken by id
+                        'created_at': f'2024-01-01 00:{n // 60 // 3:02d}:{n // 3 % 60:02d}'}
+                       for n in range(count)], 'admin', db_path=db_path)
+
+
+def walk(db_path, sort, page_size):
+    """All issue ids page by page, forwards then backwards"""
+    pages = []
+    page = Issue.paginate(sort=sort, page_size=page_size, db_path=db_path)
+    pages.append([issue['id'] for issue in page['issues']])
+    while page['next_cursor']:
+        page = Issue.paginate(sort=sort, page_size=page_size, after=page['next_cursor'], db_path=db_path)
+        pages.append([issue['id'] for issue in page['issues']])
+
+    back = [pages[-1]]
+    while page['prev_cursor']:
+        page = Issue.paginate(sort=sort, page_size=page_size, before=page['prev_cursor'], db_path=db_path)
+        back.insert(0, [issue['id'] for issue in page['issues']])
+    return pages, back
+
+
+def test_pages_follow_the_full_sort_order(db_path):
+    create_issues(db_path, 230)
+    for sort in (['-created_at'], ['created_at'], ['company', '-id'], ['-priority', 'title'], ['title', '-created_at']):
+        expected = [issue['id'] for issue in Issue.query(sort=sort, db_path=db_path)]
+        pages, back = walk(db_path, sort, 25)
+        assert [issue_id for page in pages for issue_id in page] == expected, sort
+        assert back == pages, sort
+
+
+def query_plan(conn, call):
+    """Run call() and return the EXPLAIN QUERY PLAN details of the last statement it ran"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + statements[-1])]
+
+
+def test_deep_page_seeks_the_index(db_path):
+    create_issues(db_path, 2000)
+    conn = get_db(db_path)
+    last = Issue.query(sort=['-created_at'], db_path=db_path)[1900]
+    cursor = Issue.encode_cursor([last['id']])
+
+    # Same direction on every term: a row value comparison seeks straight to the cursor
+    plan = query_plan(conn, lambda: Issue.paginate(sort=['-created_at'], after=cursor, db_path=db_path))
+    assert plan == ['SEARCH issues USING INDEX idx_issues_created (created_at<?)'], plan
+
+    # Mixed directions: the leading bound on created_at makes it one index range,
+    # not a scan or a MULTI-INDEX OR whose rows are sorted again
+    plan = query_plan(conn, lambda: Issue.paginate(sort=['-created_at', 'title'], after=cursor, db_path=db_path))
+    assert plan[0] == 'SEARCH issues USING INDEX idx_issues_created (created_at<?)', plan
+    assert 'MULTI-INDEX OR' not in plan and 'USE TEMP B-TREE FOR ORDER BY' not in plan, plan
+
+
+def test_audit_log_deep_page_seeks_the_index(db_path):
+    conn = get_db(db_path)
+    conn.executemany('''
+        INSERT INTO audit_log (timestamp, username, issue_id, action, field_name, old_value, new_value)
+        VALUES (?, ?, ?, 'Updated', 'status', 'Not Started', 'Closed')
+    ''', [(f'2024-01-01 00:{n // 120:02d}:{n // 2 % 60:02d}', ('alice', 'bob')[n % 2], n) for n in range(2000)])
+    conn.commit()
+
+    expected = [row[0] for row in conn.execute('SELECT id FROM audit_log ORDER BY timestamp DESC, id DESC')]
+    seen = []
+    page = AuditLog.paginate(page_size=150, db_path=db_path)
+    seen.extend(log['id'] for log in page['logs'])
+    while page['next_cursor']:
+        page = AuditLog.paginate(page_size=150, after=page['next_cursor'], db_path=db_path)
+        seen.extend(log['id'] for log in page['logs'])
+    assert seen == expected
+    page = AuditLog.paginate(page_size=150, before=page['prev_cursor'], db_path=db_path)
+    assert [log['id'] for log in page['logs']] == expected[-200:-50]
+
+    cursor = Issue.encode_cursor([conn.execute('SELECT timestamp FROM audit_log WHERE id = 1900').fetchone()[0], 1900])
+    plan = query_plan(conn, lambda: AuditLog.paginate(after=cursor, db_path=db_path))
+    assert plan == ['SEARCH audit_log USING INDEX idx_audit_log_timestamp (timestamp<?)'], plan
+    plan = query_plan(conn, lambda: AuditLog.paginate(filters={'username': 'bob'}, before=cursor, db_path=db_path))
+    assert plan == ['SEARCH audit_log USING INDEX idx_audit_log_username_timestamp (username=? AND timestamp>?)'], plan
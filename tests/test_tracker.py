@@ -0,0 +1,31 @@
+"""Tests for the issue tracker page"""
+import re
+
+from models import Issue, close_db, get_db
+
+
+def test_search_from_filter_form_is_ranked_by_relevance(admin_client):
+    # The best match is the oldest issue, so newest-first would list it last
+    best = Issue.create('Zebraprinter zebraprinter jam', 'zebraprinter zebraprinter zebraprinter', None, None, None,
+                        'Hardware', 'Low', 'Not Started', None, 'admin')
+    weak = Issue.create('Paper tray', 'A long note about the office that mentions zebraprinter once ' + 'x ' * 200,
+                        None, None, None, 'Hardware', 'Low', 'Not Started', None, 'admin')
+    conn = get_db()
+    conn.execute("UPDATE issues SET created_at = datetime(created_at, '-1 day') WHERE id = ?", (best,))
+    conn.commit()
+    close_db()
+
+    # What the filter form submits: its hidden sort field holds the default sort
+    response = admin_client.get('/tracker', query_string={'status': '', 'search': 'zebraprinter',
+                                                          'sort': ','.join(Issue.DEFAULT_SORT)})
+
+    assert response.status_code == 200
+    body = response.data.decode()
+    assert [int(issue_id) for issue_id in re.findall(r'issue-id">#(\d+)<', body)] == [best, weak]
+    assert 'name="sort" value="relevance"' in body
+    assert 'Relevance' in body
+
+    # An explicit column sort still wins over relevance
+    response = admin_client.get('/tracker', query_string={'status': '', 'search': 'zebraprinter',
+                                                          'sort': '-created_at,relevance'})
+    assert [int(issue_id) for issue_id in re.findall(r'issue-id">#(\d+)<', response.data.decode())] == [weak, best]
@@ -0,0 +1,129 @@
+"""
+Streaming document uploads for IT Issue Tracker
+Uploaded files are written straight to a temporary file in the uploads folder
+while the request body is parsed, hashing (SHA-256), counting and type-checking
+each chunk as it arrives, then renamed into place once the upload is accepted
+"""
+import hashlib
+import os
+import tempfile
+from flask import Request
+
+
+class UploadStream:
+    """
+    Writable target for one uploaded file. Oversized or wrongly-typed uploads
+    are detected on the chunk where it becomes clear; the rest of the body is
+    then discarded instead of written. The temporary file is removed on close
+    unless the upload was committed.
+    """
+
+    def __init__(self, folder, max_size, magic=None):
+        os.makedirs(folder, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=folder, prefix='.upload_', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self.max_size = max_size
+        self.magic = magic
+        self.size = 0
+        self.error = None
+        self.committed = False
+
+    def write(self, data):
+        if self.error:
+            return len(data)
+
+        self.size += len(data)
+        if self.size > self.max_size:
+            self._reject(f'File is too large (maximum {self.max_size // (1024 * 1024)} MB).')
+            return len(data)
+
+        # Check the file signature as soon as its first bytes arrive
+        if self.magic and len(self._head) < len(self.magic):
+            self._head += data[:len(self.magic) - len(self._head)]
+            if not self.magic.startswith(self._head):
+                self._reject('File content is not a PDF document.')
+                return len(data)
+
+        self._hash.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def _reject(self, error):
+        """Record why the upload was refused and free the space already written"""
+        self.error = error
+        self._file.seek(0)
+        self._file.truncate()
+
+    def finish(self):
+        """Validate the complete upload; returns an error message or None"""
+        if not self.error and self.size == 0:
+            self.error = 'The uploaded file is empty.'
+        if not self.error and self.magic and self._head != self.magic:
+            self.error = 'File content is not a PDF document.'
+        return self.error
+
+    @property
+    def sha256(self):
+        """Hex SHA-256 of the uploaded content"""
+        return self._hash.hexdigest()
+
+    def commit(self, path):
+        """Flush the upload to disk and atomically move it to its final path"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temp_path, path)
+        self.committed = True
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class UploadRequest(Request):
+    """
+    Request class that streams file fields of the endpoints listed in
+    STREAMED_ENDPOINTS into UploadStreams instead of Werkzeug's spooled
+    temporary files
+    """
+
+    # endpoint -> (config key of the target folder, config key of the size limit, magic bytes)
+    STREAMED_ENDPOINTS = {}
+
+    # endpoint -> config key of a request size limit used instead of MAX_CONTENT_LENGTH
+    SIZE_LIMITS = {}
+
+    @property
+    def max_content_length(self):
+        from flask import current_app
+
+        size_key = UploadRequest.SIZE_LIMITS.get(self.endpoint)
+        if size_key is None:
+            return super().max_content_length
+        return current_app.config[size_key]
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from flask import current_app
+
+        streamed = UploadRequest.STREAMED_ENDPOINTS.get(self.endpoint)
+        if streamed is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        folder_key, size_key, magic = streamed
+        return UploadStream(current_app.config[folder_key], current_app.config[size_key], magic)